@@ -0,0 +1,136 @@
+"""Thread-safe LRU cache bounded by a byte budget."""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class LRUCache:
+    """
+    Least-recently-used cache that evicts entries once their total size
+    exceeds a byte budget, and optionally after a per-entry time to live.
+
+    Callers supply the size of each value when inserting it, so the cache
+    can hold anything (numpy arrays, torch tensors, raw bytes).
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        ttl: Optional[float] = None,
+        on_evict: Optional[Callable[[Hashable], None]] = None,
+    ):
+        """
+        Args:
+            max_bytes: Total size budget for all entries
+            ttl: Seconds an entry stays valid after insertion (None = forever)
+            on_evict: Called with the key of every entry dropped for space or age
+        """
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._on_evict = on_evict
+        self._entries: "OrderedDict[Hashable, Tuple[Any, int, float]]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _expired(self, entry: Tuple[Any, int, float]) -> bool:
+        return self.ttl is not None and time.monotonic() >= entry[2]
+
+    def _drop(self, key: Hashable) -> None:
+        """Remove an entry that is being evicted. Caller holds the lock."""
+        _, nbytes, _ = self._entries.pop(key)
+        self._total_bytes -= nbytes
+        if self._on_evict is not None:
+            self._on_evict(key)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value and mark it as recently used, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry):
+                self._drop(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any, nbytes: int) -> None:
+        """
+        Insert or replace a value, evicting least-recently-used entries as needed.
+
+        Values larger than the whole budget are not cached.
+        """
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else 0.0
+        with self._lock:
+            if key in self._entries:
+                self._total_bytes -= self._entries.pop(key)[1]
+            if nbytes > self.max_bytes:
+                return
+            self._entries[key] = (value, nbytes, expires_at)
+            self._total_bytes += nbytes
+            while self._total_bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def resize(self, key: Hashable, nbytes: int) -> bool:
+        """
+        Re-account the size of an entry whose value grew or shrank in place.
+
+        Keeps the entry's expiry and recency and never inserts: returns False
+        if the entry is absent or expired. Evicts entries as put does.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or self._expired(entry):
+                return False
+            value, old_nbytes, expires_at = entry
+            self._entries[key] = (value, nbytes, expires_at)
+            self._total_bytes += nbytes - old_nbytes
+            while self._total_bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+            return key in self._entries
+
+    def pop(self, key: Hashable) -> Optional[Any]:
+        """Remove and return a value, or None if absent."""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return None
+            self._total_bytes -= entry[1]
+            return entry[0]
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and not self._expired(entry)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    def stats(self) -> Dict[str, int]:
+        """Return counters for monitoring."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
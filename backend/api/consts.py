@@ -1,7 +1,75 @@
 """Constants for mask generation and refinement."""
 
+import os
+
 from .mask_refinement_service import FeatheringMethod
 
 # Mask refinement configuration
 FEATHER_METHOD = FeatheringMethod.EASE_OUT_POWER
 FEATHER_WIDTH = 10  # pixels
+FEATHER_SMOOTH_RADIUS = 4  # pixels, open/close before feathering
+
+# Bounds for per-request refinement parameters (POST /api/results/{id}/refine)
+MAX_FEATHER_WIDTH = 100
+MAX_SMOOTH_RADIUS = 32
+
+# Distance transform for feathering: "scipy", "opencv", "band", or "auto" to
+# pick the fastest on this host with a micro-benchmark at startup
+DISTANCE_BACKEND = os.environ.get("IMGR_DISTANCE_BACKEND", "auto")
+
+# SAM architecture of SAM_CHECKPOINT_PATH: "auto" detects it from the
+# checkpoint, or a registered type ("vit_b", "vit_l", "vit_h", "vit_t")
+MODEL_TYPE = os.environ.get("SAM_MODEL_TYPE", "auto")
+
+# SAM image embedding cache (ViT embeddings are 256x64x64 float32, ~4 MiB each)
+EMBEDDING_CACHE_MAX_BYTES = int(
+    os.environ.get("SAM_EMBEDDING_CACHE_BYTES", 512 * 1024 * 1024)
+)
+
+# SAM predictor contexts sharing one copy of the model weights: concurrent
+# image encoder passes, and concurrent prompt decodes. With more than one
+# encoder, CPU threads are split between them, so a lone request encodes
+# slower; the default keeps every thread on one pass.
+PREDICTOR_POOL_SIZE = int(os.environ.get("SAM_PREDICTOR_POOL_SIZE", 1))
+DECODER_POOL_SIZE = int(os.environ.get("SAM_DECODER_POOL_SIZE", 2))
+
+# Image encoder worker processes sharing the model weights through shared
+# memory (0 encodes in-process with the predictor pool above)
+INFERENCE_PROCESSES = int(os.environ.get("SAM_INFERENCE_PROCESSES", 0))
+
+# Inference runtime: "torch" (segment_anything on PyTorch) or "onnx"
+# (ONNX Runtime on graphs exported once to SAM_ONNX_DIR). Quantization and
+# worker processes apply to the torch backend only.
+BACKEND = os.environ.get("SAM_BACKEND", "torch").lower()
+ONNX_DIR = os.environ.get("SAM_ONNX_DIR")  # defaults to backend/models/onnx
+ONNX_THREADS = int(os.environ.get("SAM_ONNX_THREADS", 0))  # 0: split CPUs between encoders
+
+# Quantize the image encoder's Linear layers ("int8"), or keep fp32 ("")
+QUANTIZE = os.environ.get("SAM_QUANTIZE", "").lower()
+
+# Decode SAM masks from the 256x256 low-resolution logits, upsampling only
+# the bbox of each candidate instead of all three at full resolution
+LOW_RES_MASKS = os.environ.get("SAM_LOW_RES_MASKS", "0").lower() in ("1", "true", "yes")
+
+# Uploaded image store: LRU with a byte budget and a per-image time to live
+UPLOAD_STORE_MAX_BYTES = int(os.environ.get("IMGR_UPLOAD_STORE_BYTES", 1024 * 1024 * 1024))
+UPLOAD_TTL_SECONDS = float(os.environ.get("IMGR_UPLOAD_TTL_SECONDS", 60 * 60))
+
+# Decoded RGB uint8 arrays of uploaded images (a 24 MP photo is ~72 MiB)
+DECODED_IMAGE_CACHE_MAX_BYTES = int(
+    os.environ.get("IMGR_DECODED_IMAGE_CACHE_BYTES", 512 * 1024 * 1024)
+)
+
+# Threads for mask compositing and PNG encoding, kept off the event loop
+POSTPROCESS_WORKERS = int(os.environ.get("IMGR_POSTPROCESS_WORKERS", 4))
+
+# Encoded mask/cut-out PNGs served from /api/results
+RESULT_STORE_MAX_BYTES = int(os.environ.get("IMGR_RESULT_STORE_BYTES", 256 * 1024 * 1024))
+RESULT_TTL_SECONDS = float(os.environ.get("IMGR_RESULT_TTL_SECONDS", 60 * 60))
+
+# Smoothed, band-clipped distance fields kept per candidate so that changing
+# the feathering method or width (up to the band) skips morphology and the EDT
+DISTANCE_FIELD_BAND = 32  # pixels, widest feather served from the cache
+DISTANCE_FIELD_CACHE_MAX_BYTES = int(
+    os.environ.get("IMGR_DISTANCE_FIELD_CACHE_BYTES", 256 * 1024 * 1024)
+)
@@ -0,0 +1,90 @@
+"""Background worker that computes SAM image embeddings ahead of /api/run."""
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+from .consts import INFERENCE_PROCESSES, PREDICTOR_POOL_SIZE
+
+# One worker per pooled encoder predictor (or encoder process); torch threads
+# are split between them
+_encoder_executor = ThreadPoolExecutor(
+    max_workers=INFERENCE_PROCESSES or PREDICTOR_POOL_SIZE, thread_name_prefix="sam-encoder"
+)
+_pending: Dict[str, Future] = {}
+_pending_lock = threading.Lock()
+
+
+class EmbeddingNotReadyError(Exception):
+    """Raised when a decoder-only request arrives before the image embedding exists."""
+
+    def __init__(self, image_id: str, pending: bool):
+        self.image_id = image_id
+        self.pending = pending
+        state = "still being computed" if pending else "not computed"
+        super().__init__(f"Embedding for image {image_id} is {state}")
+
+
+def _compute_embedding(image_id: str, load_image: Callable[[], np.ndarray]) -> None:
+    """Load the decoded image and populate the SAM embedding cache."""
+    from .sam_service import get_sam_service
+
+    sam_service = get_sam_service()
+    # Already embedded (e.g. a re-upload): skip decoding the original
+    if sam_service.has_embedding(image_id):
+        return
+    sam_service.compute_embedding(load_image(), image_id)
+
+
+def _forget(image_id: str, future: Future) -> None:
+    with _pending_lock:
+        if _pending.get(image_id) is future:
+            del _pending[image_id]
+
+
+def schedule_embedding(image_id: str, load_image: Callable[[], np.ndarray]) -> Future:
+    """
+    Queue the image encoder pass for an uploaded image.
+
+    Scheduling the same image twice while it is in flight returns the existing job.
+
+    Args:
+        image_id: Identity of the uploaded image
+        load_image: Returns the decoded RGB array; called on the worker thread
+
+    Returns:
+        Future that completes once the embedding is cached
+    """
+    with _pending_lock:
+        future = _pending.get(image_id)
+        if future is not None:
+            return future
+        future = _encoder_executor.submit(_compute_embedding, image_id, load_image)
+        _pending[image_id] = future
+    # Outside the lock: a future that is already done runs the callback inline
+    future.add_done_callback(lambda done: _forget(image_id, done))
+    return future
+
+
+def is_embedding_pending(image_id: str) -> bool:
+    """Return True if an encoder pass for this image is queued or running."""
+    with _pending_lock:
+        return image_id in _pending
+
+
+def wait_for_embedding(image_id: str, timeout: Optional[float] = None) -> None:
+    """
+    Block until any in-flight encoder pass for this image has finished.
+
+    Failures are not raised here; the caller falls back to encoding inline.
+    """
+    with _pending_lock:
+        future = _pending.get(image_id)
+    if future is None:
+        return
+    try:
+        future.result(timeout=timeout)
+    except Exception as e:
+        print(f"Warning: Background embedding for {image_id} failed: {e}")
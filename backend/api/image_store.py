@@ -0,0 +1,111 @@
+"""Bounded in-memory store for uploaded image bytes and their decoded pixels."""
+
+import io
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import numpy as np
+from PIL import Image
+
+from .cache import LRUCache
+
+
+def decode_rgb(contents: bytes) -> np.ndarray:
+    """
+    Decode image file bytes to a read-only RGB uint8 array (H, W, 3).
+
+    The array is marked non-writeable so it can be shared between requests
+    and pipeline stages without defensive copies.
+    """
+    image = Image.open(io.BytesIO(contents))
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    image_np = np.asarray(image)
+    image_np.flags.writeable = False
+    return image_np
+
+
+class ImageEvictedError(KeyError):
+    """Raised when an image was stored but has since been evicted or expired."""
+
+
+class ImageStore:
+    """
+    Byte-budgeted, TTL-bounded LRU store for uploaded images.
+
+    Remembers the IDs of recently evicted images so callers can tell
+    "never uploaded" apart from "uploaded but gone". Decoded pixels are kept
+    in a second, separately budgeted LRU cache so repeat requests skip the
+    PNG/JPEG decode.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        ttl: Optional[float] = None,
+        decoded_max_bytes: int = 0,
+        max_tombstones: int = 10000,
+    ):
+        self._cache = LRUCache(max_bytes, ttl=ttl, on_evict=self._remember_evicted)
+        self._decoded = LRUCache(decoded_max_bytes)
+        self._tombstones: "OrderedDict[str, None]" = OrderedDict()
+        self._max_tombstones = max_tombstones
+        self._tombstone_lock = threading.Lock()
+
+    def _remember_evicted(self, image_id: str) -> None:
+        self._decoded.pop(image_id)
+        with self._tombstone_lock:
+            self._tombstones[image_id] = None
+            self._tombstones.move_to_end(image_id)
+            while len(self._tombstones) > self._max_tombstones:
+                self._tombstones.popitem(last=False)
+
+    @property
+    def max_bytes(self) -> int:
+        """Largest image the store can hold (its whole byte budget)."""
+        return self._cache.max_bytes
+
+    def put(self, image_id: str, contents: bytes) -> None:
+        """Store image bytes under an ID; images above max_bytes are not stored."""
+        with self._tombstone_lock:
+            self._tombstones.pop(image_id, None)
+        self._cache.put(image_id, contents, len(contents))
+
+    def get(self, image_id: str) -> bytes:
+        """
+        Return the stored bytes for an image.
+
+        Raises:
+            ImageEvictedError: If the image was evicted or expired
+            KeyError: If the image was never stored
+        """
+        contents = self._cache.get(image_id)
+        if contents is not None:
+            return contents
+        with self._tombstone_lock:
+            evicted = image_id in self._tombstones
+        if evicted:
+            raise ImageEvictedError(image_id)
+        raise KeyError(image_id)
+
+    def get_array(self, image_id: str) -> np.ndarray:
+        """
+        Return the decoded, read-only RGB uint8 array for an image.
+
+        Raises:
+            ImageEvictedError: If the image was evicted or expired
+            KeyError: If the image was never stored
+        """
+        image_np = self._decoded.get(image_id)
+        if image_np is None:
+            image_np = decode_rgb(self.get(image_id))
+            self._decoded.put(image_id, image_np, image_np.nbytes)
+        return image_np
+
+    def __contains__(self, image_id: str) -> bool:
+        return image_id in self._cache
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Return cache counters for monitoring."""
+        return {"encoded": self._cache.stats(), "decoded": self._decoded.stats()}
@@ -0,0 +1,119 @@
+"""Image encoder worker processes sharing the SAM weights through shared memory."""
+
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import torch
+import torch.multiprocessing as mp
+from segment_anything import SamPredictor
+from segment_anything.utils.transforms import ResizeLongestSide
+
+from .quantization import quantize_image_encoder
+
+# Per-process predictor of a worker, built around the shared model
+_worker_predictor: Optional[SamPredictor] = None
+
+
+def _init_worker(model: torch.nn.Module, num_threads: int, quantize: str) -> None:
+    """Worker initializer: wrap the shared model, limit intra-op threads."""
+    global _worker_predictor
+    torch.set_num_threads(num_threads)
+    if quantize:
+        # Replaces this process's encoder with a private int8 copy
+        quantize_image_encoder(model, quantize)
+    _worker_predictor = SamPredictor(model)
+
+
+def _encode_in_worker(
+    input_image: np.ndarray, original_size: Tuple[int, int]
+) -> Tuple[np.ndarray, Tuple[int, int]]:
+    """
+    Run the image encoder on an image already resized for SAM.
+
+    Mirrors SamPredictor.set_image after its resize step.
+
+    Returns:
+        (features as a numpy array, input size)
+    """
+    predictor = _worker_predictor
+    input_image_torch = torch.as_tensor(input_image, device=predictor.device)
+    input_image_torch = input_image_torch.permute(2, 0, 1).contiguous()[None, :, :, :]
+    predictor.set_torch_image(input_image_torch, original_size)
+    features = predictor.features.cpu().numpy()
+    input_size = predictor.input_size
+    predictor.reset_image()
+    return features, input_size
+
+
+class InferenceWorkerPool:
+    """
+    Runs image encoder passes in worker processes.
+
+    The model is moved to shared memory once, in the API process, and
+    handed to spawned workers by reference, so N workers add no copies of
+    the weights. Each worker encodes with its own interpreter and torch
+    thread pool, so encoder throughput is not bound by one process's GIL.
+    Images are resized to SAM's input size before crossing the process
+    boundary; features come back as arrays.
+    """
+
+    def __init__(self, model: torch.nn.Module, num_workers: int, quantize: str = ""):
+        """
+        Args:
+            model: Loaded fp32 SAM model; its parameters are moved to shared memory
+            num_workers: Number of encoder processes
+            quantize: Quantization mode applied by each worker to its encoder
+                (see quantize_image_encoder); quantized modules cannot be
+                passed to workers, so the model itself must stay fp32
+        """
+        model.share_memory()
+        self.num_workers = num_workers
+        self._transform = ResizeLongestSide(model.image_encoder.img_size)
+        threads = max(1, (os.cpu_count() or 1) // num_workers)
+        self._executor = ProcessPoolExecutor(
+            max_workers=num_workers,
+            mp_context=mp.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(model, threads, quantize),
+        )
+        self._lock = threading.Lock()
+        self._submitted = 0
+        self._in_flight = 0
+
+    def encode(self, image: np.ndarray) -> Tuple[torch.Tensor, Tuple[int, int]]:
+        """
+        Compute image features in a worker process.
+
+        Args:
+            image: RGB uint8 array (H, W, 3)
+
+        Returns:
+            (features tensor, input size), as SamPredictor would hold them
+        """
+        input_image = self._transform.apply_image(image)
+        with self._lock:
+            self._submitted += 1
+            self._in_flight += 1
+        try:
+            future = self._executor.submit(_encode_in_worker, input_image, image.shape[:2])
+            features, input_size = future.result()
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+        return torch.from_numpy(features), tuple(input_size)
+
+    def shutdown(self) -> None:
+        """Stop the worker processes, dropping queued passes."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, int]:
+        """Return utilization counters for monitoring."""
+        with self._lock:
+            return {
+                "size": self.num_workers,
+                "submitted": self._submitted,
+                "in_flight": self._in_flight,
+            }
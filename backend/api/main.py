@@ -1,5 +1,10 @@
+import asyncio
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from .consts import DISTANCE_BACKEND, DISTANCE_FIELD_BAND
+from .mask_refinement_service import set_distance_backend
+from .metrics import event_loop_lag_monitor
 from .routes import router
 
 app = FastAPI(title="Imgr API")
@@ -17,11 +22,19 @@ app.add_middleware(
 app.include_router(router, prefix="/api")
 
 
+_background_tasks = []
+
+
 @app.on_event("startup")
 async def startup_event():
     """Initialize SAM model on startup"""
     from .sam_service import get_sam_service
 
+    _background_tasks.append(asyncio.create_task(event_loop_lag_monitor.run()))
+
+    distance_backend = set_distance_backend(DISTANCE_BACKEND, DISTANCE_FIELD_BAND)
+    print(f"Using {distance_backend} distance transform for mask feathering")
+
     print("Initializing SAM service...")
     try:
         get_sam_service()
@@ -31,6 +44,17 @@ async def startup_event():
         print("The service will attempt to initialize on first request")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background monitoring tasks and encoder worker processes"""
+    from .sam_service import shutdown_sam_service
+
+    for task in _background_tasks:
+        task.cancel()
+    _background_tasks.clear()
+    shutdown_sam_service()
+
+
 @app.get("/")
 async def root():
     return {"message": "Imgr API"}
@@ -1,12 +1,50 @@
 """Mask generation service that orchestrates SAM and mask refinement."""
 
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .cache import LRUCache
+from .consts import (
+    DISTANCE_FIELD_BAND,
+    DISTANCE_FIELD_CACHE_MAX_BYTES,
+    FEATHER_METHOD,
+    FEATHER_SMOOTH_RADIUS,
+    FEATHER_WIDTH,
+)
+from .mask_refinement_service import (
+    FeatheringMethod,
+    apply_feathering_u8,
+    distance_field,
+    feather_distance_field,
+)
+from .metrics import register_cache
+from .sam_service import get_sam_service
 
-from PIL import Image
 
-from .consts import FEATHER_METHOD, FEATHER_WIDTH
-from .mask_refinement_service import apply_feathering
-from .sam_service import get_sam_service
+# Distance fields keyed by (cache key, candidate index, smoothing radius)
+_distance_fields = LRUCache(DISTANCE_FIELD_CACHE_MAX_BYTES)
+register_cache("distance_fields", _distance_fields.stats)
+
+
+def _refine_mask(
+    mask: np.ndarray,
+    index: int,
+    method: FeatheringMethod,
+    width: float,
+    smooth_radius: int,
+    cache_key: Optional[str],
+) -> np.ndarray:
+    """Feather a single raw SAM candidate straight to uint8 alpha."""
+    if cache_key is None:
+        return apply_feathering_u8(mask, method, width, smooth_radius=smooth_radius)
+
+    key = (cache_key, index, smooth_radius)
+    field = _distance_fields.get(key)
+    if field is None or field.band < width:
+        field = distance_field(mask, smooth_radius, band=max(DISTANCE_FIELD_BAND, width))
+        _distance_fields.put(key, field, field.nbytes)
+    return feather_distance_field(field, method, width)
 
 
 class MaskGenerationService:
@@ -20,42 +58,105 @@ class MaskGenerationService:
         return cls._instance
 
     def generate_masks(
-        self, image: Image.Image, points: List[Dict[str, int]], labels: List[int]
+        self,
+        image: np.ndarray,
+        points: List[Dict[str, int]],
+        labels: List[int],
+        image_id: Optional[str] = None,
+        multimask: bool = True,
+        top_k: Optional[int] = None,
+        min_score: Optional[float] = None,
     ) -> List[Dict[str, any]]:
         """
-        Generate and refine masks for given image and points.
+        Generate unrefined masks for given image and points.
 
         Args:
-            image: PIL Image (RGB)
+            image: RGB uint8 array (H, W, 3), used read-only
             points: List of dicts with 'x' and 'y' keys
             labels: List of ints (1 for positive/foreground, 0 for negative/background)
+            image_id: Optional identity of the image, used to reuse its SAM embedding
+            multimask: Ask SAM for 3 candidates (True) or its single best mask
+            top_k: Keep at most this many candidates
+            min_score: Drop candidates scoring below this
+
+        Dropped candidates are never upsampled. Each kept candidate is refined
+        later, on its own, with refine_candidate.
 
         Returns:
-            List of dicts containing:
-                - mask: numpy float array (H, W) with values in [0, 1]
+            List of dicts, highest score first, containing:
+                - mask: numpy boolean array (H, W)
                 - score: float confidence score
         """
         # Get raw masks from SAM service
         sam_service = get_sam_service()
-        raw_results = sam_service.generate_masks(image, points, labels)
+        return sam_service.generate_masks(
+            image,
+            points,
+            labels,
+            image_id=image_id,
+            multimask=multimask,
+            top_k=top_k,
+            min_score=min_score,
+        )
+
+    def predict_masks(
+        self,
+        image_id: str,
+        points: List[Dict[str, int]],
+        labels: List[int],
+        multimask: bool = True,
+        top_k: Optional[int] = None,
+        min_score: Optional[float] = None,
+    ) -> Tuple[List[Dict[str, any]], Tuple[int, int]]:
+        """
+        Generate unrefined masks using only the SAM decoder.
 
-        # Apply feathering to each mask using configured method and width
-        refined_results = []
-        for result in raw_results:
-            mask = result["mask"]
-            score = result["score"]
+        Args:
+            image_id: Identity of an image whose embedding is already computed
+            points: List of dicts with 'x' and 'y' keys
+            labels: List of ints (1 for positive/foreground, 0 for negative/background)
+            multimask, top_k, min_score: Candidate selection, as in generate_masks
 
-            # Apply feathering with configured method and width from consts.py
-            feathered_mask = apply_feathering(mask, FEATHER_METHOD, FEATHER_WIDTH)
+        Returns:
+            The candidates, as in generate_masks, and the (height, width) of
+            the image, so callers need not decode it
+
+        Raises:
+            EmbeddingNotReadyError: If the image embedding is not available yet
+        """
+        sam_service = get_sam_service()
+        return sam_service.predict_masks(
+            image_id, points, labels, multimask=multimask, top_k=top_k, min_score=min_score
+        )
+
+    def refine_candidate(
+        self,
+        mask: np.ndarray,
+        index: int,
+        method: FeatheringMethod = FEATHER_METHOD,
+        width: float = FEATHER_WIDTH,
+        smooth_radius: int = FEATHER_SMOOTH_RADIUS,
+        cache_key: Optional[str] = None,
+    ) -> np.ndarray:
+        """
+        Smooth and feather a single raw SAM mask on the calling thread.
 
-            refined_results.append(
-                {
-                    "mask": feathered_mask,
-                    "score": score,
-                }
-            )
+        With a cache_key, the candidate's smoothed distance field is cached, so
+        refining the same mask again with another method or a width up to
+        DISTANCE_FIELD_BAND is a single lookup-table pass.
 
-        return refined_results
+        Args:
+            mask: Unrefined boolean SAM mask (H, W)
+            index: Position of the candidate in its request, part of the cache key
+            method: Feathering profile (defaults to the configured one)
+            width: Feather width in pixels
+            smooth_radius: Open/close radius in pixels (0 disables smoothing)
+            cache_key: Identity of the unrefined masks of the request, or None
+
+        Returns:
+            uint8 alpha array (H, W)
+        """
+        return _refine_mask(mask, index, method, width, smooth_radius, cache_key)
 
 
 # Global singleton instance
@@ -1,4 +1,9 @@
+import threading
+import time
+from dataclasses import dataclass
 from enum import Enum
+from functools import lru_cache
+from typing import Dict, Iterator, Optional, Tuple
 
 import cv2
 import numpy as np
@@ -49,12 +54,54 @@ def _feather(mask: np.ndarray, g, w) -> np.ndarray:
     return alpha
 
 
+# ----# Profiles g(t), t in [0, 1] across the ramp (see the feather_* docstrings)
+
+
+def _profile_linear(t: np.ndarray) -> np.ndarray:
+    return 1.0 - t
+
+
+def _profile_exp(t: np.ndarray) -> np.ndarray:
+    k = np.log(100.0)  # ≈4.605; g(1) ~ 0.01
+    return np.exp(-k * t)
+
+
+def _profile_cos(t: np.ndarray) -> np.ndarray:
+    return 0.5 * (1.0 + np.cos(np.pi * t))
+
+
+def _profile_sigmoid(t: np.ndarray) -> np.ndarray:
+    a = 12.0
+    return 1.0 / (1.0 + np.exp(a * (t - 0.5)))
+
+
+def _profile_ease_out_power(t: np.ndarray) -> np.ndarray:
+    p = 3.0
+    return 1.0 - np.power(t, p)
+
+
+def _profile_ease_out_exp(t: np.ndarray) -> np.ndarray:
+    q = 3.0
+    k = np.log(100.0)
+    return np.exp(-k * np.power(t, q))
+
+
+FEATHER_PROFILES = {
+    FeatheringMethod.LINEAR: _profile_linear,
+    FeatheringMethod.EXPONENTIAL: _profile_exp,
+    FeatheringMethod.COSINE: _profile_cos,
+    FeatheringMethod.SIGMOID: _profile_sigmoid,
+    FeatheringMethod.EASE_OUT_POWER: _profile_ease_out_power,
+    FeatheringMethod.EASE_OUT_EXP: _profile_ease_out_exp,
+}
+
+
 def feather_linear(mask: np.ndarray, width: float = 10.0) -> np.ndarray:
     """
     Linear profile: g(t) = 1 - t
     t=0 at boundary (value 1), t=1 at width w (value 0).
     """
-    return _feather(mask, g=lambda t: 1.0 - t, w=width)
+    return _feather(mask, g=_profile_linear, w=width)
 
 
 def feather_exp(mask: np.ndarray, width: float = 10.0) -> np.ndarray:
@@ -62,8 +109,7 @@ def feather_exp(mask: np.ndarray, width: float = 10.0) -> np.ndarray:
     Exponential profile: g(t) = exp(-k * t)
     k: decay rate; larger k => faster falloff. Here k≈4.605 gives ~1% at t=1.
     """
-    k = np.log(100.0)  # ≈4.605; g(1) ~ 0.01
-    return _feather(mask, g=lambda t: np.exp(-k * t), w=width)
+    return _feather(mask, g=_profile_exp, w=width)
 
 
 def feather_cos(mask: np.ndarray, width: float = 10.0) -> np.ndarray:
@@ -71,7 +117,7 @@ def feather_cos(mask: np.ndarray, width: float = 10.0) -> np.ndarray:
     Cosine (C¹-smooth) profile: g(t) = (1 + cos(pi * t)) / 2
     Smooth at both ends with zero slope at t=0 and t=1.
     """
-    return _feather(mask, g=lambda t: 0.5 * (1.0 + np.cos(np.pi * t)), w=width)
+    return _feather(mask, g=_profile_cos, w=width)
 
 
 def feather_sigmoid(mask: np.ndarray, width: float = 10.0) -> np.ndarray:
@@ -81,8 +127,7 @@ def feather_sigmoid(mask: np.ndarray, width: float = 10.0) -> np.ndarray:
     a: steepness; larger a => sharper mid transition. Here a=12 is a good default.
     Note: logistic never hits exact 0/1 at the ends; clamping by band keeps endpoints correct overall.
     """
-    a = 12.0
-    return _feather(mask, g=lambda t: 1.0 / (1.0 + np.exp(a * (t - 0.5))), w=width)
+    return _feather(mask, g=_profile_sigmoid, w=width)
 
 
 def feather_ease_out_power(mask: np.ndarray, width: float = 10.0) -> np.ndarray:
@@ -91,8 +136,7 @@ def feather_ease_out_power(mask: np.ndarray, width: float = 10.0) -> np.ndarray:
       g(t) = 1 - t^p,  p>1
     p=3 gives a delayed falloff near the edge and steeper descent near t≈1.
     """
-    p = 3.0
-    return _feather(mask, g=lambda t: 1.0 - np.power(t, p), w=width)
+    return _feather(mask, g=_profile_ease_out_power, w=width)
 
 
 def feather_ease_out_exp(mask: np.ndarray, width: float = 10.0) -> np.ndarray:
@@ -102,9 +146,260 @@ def feather_ease_out_exp(mask: np.ndarray, width: float = 10.0) -> np.ndarray:
     q>1 delays decay; k sets level at t=1.
     q=3, k≈4.605 ⇒ g(1)≈0.01 (≈1% at ramp end).
     """
-    q = 3.0
-    k = np.log(100.0)
-    return _feather(mask, g=lambda t: np.exp(-k * np.power(t, q)), w=width)
+    return _feather(mask, g=_profile_ease_out_exp, w=width)
+
+
+# ----# Per-thread scratch buffers
+#
+# Refinement runs on worker threads; each thread keeps its own growable
+# buffers so repeated requests reuse memory instead of allocating several
+# temporaries per mask. The fused kernels work on row strips, so buffers are
+# sized by a strip rather than by the object, and a thread only keeps them
+# between calls up to SCRATCH_RETAIN_BYTES.
+
+_thread_scratch = threading.local()
+
+SCRATCH_RETAIN_BYTES = 16 * 1024 * 1024
+
+
+def _scratch(name: str, shape: Tuple[int, ...], dtype) -> np.ndarray:
+    """
+    Thread-local uninitialized array, reused across calls with the same name.
+
+    The contents are only valid until the same name is requested again on
+    this thread.
+    """
+    buffers = getattr(_thread_scratch, "buffers", None)
+    if buffers is None:
+        buffers = _thread_scratch.buffers = {}
+    dtype = np.dtype(dtype)
+    nbytes = int(np.prod(shape)) * dtype.itemsize
+    buffer = buffers.get(name)
+    if buffer is None or buffer.nbytes < nbytes:
+        buffer = buffers[name] = np.empty(nbytes, dtype=np.uint8)
+    return buffer[:nbytes].view(dtype).reshape(shape)
+
+
+def _trim_scratch() -> None:
+    """Free this thread's scratch buffers if they exceed SCRATCH_RETAIN_BYTES."""
+    buffers = getattr(_thread_scratch, "buffers", None)
+    if buffers and sum(buffer.nbytes for buffer in buffers.values()) > SCRATCH_RETAIN_BYTES:
+        buffers.clear()
+
+
+# ----# Distance backends
+#
+# Each backend maps a boolean mask M and a feather width to the squared
+# Euclidean distance from every pixel outside M to the nearest pixel of M
+# (0 inside M). Values only need to be exact below max_distance²; anything
+# farther is outside the ramp and may be clipped. Results live in per-thread
+# scratch buffers and may be modified in place by the caller.
+
+
+def _sq_distance_scipy(M: np.ndarray, max_distance: float) -> np.ndarray:
+    """Exact EDT from scipy (float64, single-threaded)."""
+    outside = np.logical_not(M, out=_scratch("outside", M.shape, np.bool_))
+    d = _scratch("distance", M.shape, np.float64)
+    distance_transform_edt(outside, distances=d)
+    return np.multiply(d, d, out=d)
+
+
+def _sq_distance_opencv(M: np.ndarray, max_distance: float) -> np.ndarray:
+    """Exact EDT from OpenCV (DIST_L2 + DIST_MASK_PRECISE) in float32."""
+    outside = _scratch("outside", M.shape, np.uint8)
+    np.logical_not(M, out=outside.view(np.bool_))
+    d = _scratch("distance", M.shape, np.float32)
+    cv2.distanceTransform(outside, cv2.DIST_L2, cv2.DIST_MASK_PRECISE, dst=d, dstType=cv2.CV_32F)
+    return np.multiply(d, d, out=d)
+
+
+def _sq_distance_band(M: np.ndarray, max_distance: float) -> np.ndarray:
+    """
+    Exact squared EDT limited to the feather band, in int32.
+
+    Separable brute force over offsets |dx|, |dy| < band: a row pass finds the
+    horizontal distance to the nearest mask pixel, then a column pass combines
+    rows. Cost is O(band * pixels), independent of how far the image extends
+    beyond the band.
+    """
+    band = max(int(np.ceil(max_distance)), 1)
+    cap = band * band
+
+    # Row pass: squared horizontal distance, capped
+    row = _scratch("band_row", M.shape, np.int32)
+    row.fill(cap)
+    row[M] = 0
+    hit = _scratch("band_hit", M.shape, np.bool_)
+    for dx in range(1, band):
+        dx2 = dx * dx
+        # Offsets grow monotonically, so only still-unreached pixels can improve
+        for dst, src, h in (
+            (row[:, dx:], M[:, :-dx], hit[:, dx:]),
+            (row[:, :-dx], M[:, dx:], hit[:, :-dx]),
+        ):
+            np.equal(dst, cap, out=h)
+            np.logical_and(h, src, out=h)
+            np.copyto(dst, dx2, where=h)
+
+    # Column pass: d²(y) = min over dy of row(y + dy) + dy²
+    d2 = _scratch("band_d2", M.shape, np.int32)
+    np.copyto(d2, row)
+    shifted = _scratch("band_shifted", M.shape, np.int32)
+    for dy in range(1, band):
+        dy2 = dy * dy
+        np.add(row[:-dy], dy2, out=shifted[:-dy])
+        np.minimum(d2[dy:], shifted[:-dy], out=d2[dy:])
+        np.add(row[dy:], dy2, out=shifted[dy:])
+        np.minimum(d2[:-dy], shifted[dy:], out=d2[:-dy])
+    return d2
+
+
+DISTANCE_BACKENDS = {
+    "scipy": _sq_distance_scipy,
+    "opencv": _sq_distance_opencv,
+    "band": _sq_distance_band,
+}
+
+_distance_backend = "scipy"
+
+
+def benchmark_distance_backends(width: float, size: int = 512, repeats: int = 3) -> Dict[str, float]:
+    """
+    Time every distance backend on a synthetic mask on this host.
+
+    Args:
+        width: Distance band to compute, as served (the band backend's cost
+               grows with it, the exact transforms' does not)
+        size: Side of the square test mask
+        repeats: Runs per backend; the fastest counts
+
+    Returns:
+        Best wall time in seconds per backend name
+    """
+    yy, xx = np.mgrid[:size, :size]
+    M = (yy - size / 2) ** 2 + (xx - size / 3) ** 2 < (size / 4) ** 2
+
+    timings = {}
+    for name, backend in DISTANCE_BACKENDS.items():
+        best = float("inf")
+        for _ in range(repeats):
+            start = time.perf_counter()
+            backend(M, width)
+            best = min(best, time.perf_counter() - start)
+        timings[name] = best
+    return timings
+
+
+def set_distance_backend(name: str, width: float) -> str:
+    """
+    Select the distance transform used for feathering.
+
+    Args:
+        name: "scipy", "opencv", "band", or "auto" to pick the fastest backend
+              on this host with a short micro-benchmark
+        width: Distance band the backend is benchmarked at for "auto"; the
+               cached distance fields are computed to DISTANCE_FIELD_BAND
+
+    Returns:
+        Name of the selected backend
+    """
+    global _distance_backend
+    if name == "auto":
+        timings = benchmark_distance_backends(width)
+        name = min(timings, key=timings.get)
+    if name not in DISTANCE_BACKENDS:
+        raise ValueError(f"Unknown distance backend: {name}")
+    _distance_backend = name
+    return name
+
+
+def get_distance_backend() -> str:
+    """Name of the currently selected distance backend."""
+    return _distance_backend
+
+
+# ----# Lookup-table feathering
+#
+# The profile only depends on the outside distance, and exact EDT distances are
+# square roots of integers, so each (method, width) compiles to a dense table
+# indexed by the squared distance. Applying it is one gather, with no per-pixel
+# exp/pow/cos and no full-size float64 temporaries for t and g(t).
+
+
+@lru_cache(maxsize=64)
+def profile_lut(method: FeatheringMethod, width: float) -> np.ndarray:
+    """
+    Alpha for every integer squared outside distance d2 in [0, ceil(width²)].
+
+    Entry 0 is the mask interior (alpha 1); entries with d2 >= width² are
+    outside the ramp (alpha 0).
+    """
+    g = FEATHER_PROFILES[method]
+    w2 = float(width) * float(width)
+    d2 = np.arange(int(np.ceil(w2)) + 1, dtype=np.float64)
+    t = np.clip(np.sqrt(d2) / width, 0.0, 1.0)
+    lut = g(t).astype(np.float32)
+    lut[d2 >= w2] = 0.0  # Outside band
+    lut[0] = 1.0  # Preserve interior exactly
+    lut.flags.writeable = False
+    return lut
+
+
+@lru_cache(maxsize=64)
+def profile_lut_u8(method: FeatheringMethod, width: float) -> np.ndarray:
+    """profile_lut quantized to uint8 alpha (0-255)."""
+    lut = np.rint(profile_lut(method, width) * 255.0).astype(np.uint8)
+    lut.flags.writeable = False
+    return lut
+
+
+def feather_lut(mask: np.ndarray, method: FeatheringMethod, width: float = 10.0) -> np.ndarray:
+    """
+    Feather with a precompiled profile table; matches the feather_* functions.
+
+    Args:
+        mask: Binary array (0/1 or bool)
+        method: Any FeatheringMethod except NONE
+        width: Feather width in pixels
+
+    Returns:
+        Float32 alpha array with values in [0, 1]
+    """
+    M = mask.astype(bool)
+    # Trivial edge cases
+    if not M.any():
+        return np.zeros_like(mask, dtype=np.float32)
+    if M.all():
+        return np.ones_like(mask, dtype=np.float32)
+
+    lut = profile_lut(method, width)
+
+    return lut[_lut_index(M, len(lut) - 1, width)]
+
+
+def _index_dtype(max_index: int) -> np.dtype:
+    """Narrowest table index type: uint16 covers widths up to 255 pixels."""
+    return np.dtype(np.uint16 if max_index <= np.iinfo(np.uint16).max else np.int32)
+
+
+def _lut_index(M: np.ndarray, max_index: int, width: float, rows: slice = slice(None)) -> np.ndarray:
+    """
+    Squared outside distance as an integer table index (scratch buffer).
+
+    Args:
+        M: Boolean mask the distances are computed on
+        max_index: Last table index; larger distances are clipped to it
+        width: Distances only need to be exact below width²
+        rows: Rows of M to return indices for
+    """
+    d2 = DISTANCE_BACKENDS[_distance_backend](M, width)[rows]
+    np.minimum(d2, max_index, out=d2)
+    if d2.dtype.kind == "f":
+        # Round back to the exact integer squared distance
+        np.rint(d2, out=d2)
+    index = _scratch("lut_index", d2.shape, _index_dtype(max_index))
+    np.copyto(index, d2, casting="unsafe")
+    return index
 
 
 # ----# Smoothing
@@ -142,41 +437,306 @@ def smooth_open_close(mask: np.ndarray, r: int = 2) -> np.ndarray:
     return _to_bool(closed)
 
 
+# ----# Region of interest
+
+
+def nonzero_bbox(mask: np.ndarray) -> Optional[Tuple[int, int, int, int]]:
+    """
+    Bounding box (x_min, y_min, x_max, y_max) of the nonzero pixels, or None if empty.
+
+    Reduces rows once, then scans columns only over the occupied row band,
+    without building a full-size boolean copy.
+    """
+    rows = np.flatnonzero(mask.any(axis=1))
+    if rows.size == 0:
+        return None
+    y_min, y_max = int(rows[0]), int(rows[-1]) + 1
+    cols = np.flatnonzero(mask[y_min:y_max].any(axis=0))
+    return int(cols[0]), y_min, int(cols[-1]) + 1, y_max
+
+
+def _roi_slices(mask: np.ndarray, pad: int) -> Optional[Tuple[slice, slice]]:
+    """Mask bbox grown by pad pixels on every side and clamped to the image."""
+    bbox = nonzero_bbox(mask)
+    if bbox is None:
+        return None
+    x_min, y_min, x_max, y_max = bbox
+    height, width = mask.shape[:2]
+    return (
+        slice(max(y_min - pad, 0), min(y_max + pad, height)),
+        slice(max(x_min - pad, 0), min(x_max + pad, width)),
+    )
+
+
 #
 #
 def apply_feathering(
-    mask: np.ndarray, method: FeatheringMethod, width: float = 10.0
+    mask: np.ndarray, method: FeatheringMethod, width: float = 10.0, smooth_radius: int = 4
 ) -> np.ndarray:
     """
     Apply feathering to a mask using the specified method.
 
+    Smoothing and feathering only run on the mask bbox grown by the feather
+    width plus the morphology reach; everything outside is zero, so the
+    result is pasted into a zero canvas. Output is identical to processing
+    the full image, but cost scales with object size. Profiles are applied
+    through precompiled lookup tables (see profile_lut).
+
     Args:
         mask: Binary or float mask array (0/1 or bool), arbitrary shape
         method: FeatheringMethod enum specifying which feathering to apply
         width: Feather width in pixels (default 10.0)
+        smooth_radius: Open/close disk radius in pixels (0 disables smoothing)
 
     Returns:
         Float mask array with values in [0, 1]
     """
+    # Open/close needs 2r of zero margin to behave as on the full image, and
+    # the ramp reaches w beyond the smoothed boundary (which grows by <= r),
+    # so pixels farther than this from the bbox are always zero.
+    pad = int(np.ceil(width)) + 2 * smooth_radius + 2
+    roi = _roi_slices(mask, pad)
+    alpha = np.zeros(mask.shape, dtype=np.float32)
+    if roi is None:
+        return alpha
 
-    mask = smooth_open_close(mask, r=4)
+    sub_mask = smooth_open_close(mask[roi], r=smooth_radius)
 
     if method == FeatheringMethod.NONE:
-        return mask.astype(np.float32)
-    elif method == FeatheringMethod.LINEAR:
-        return feather_linear(mask, width)
-    elif method == FeatheringMethod.EXPONENTIAL:
-        return feather_exp(mask, width)
-    elif method == FeatheringMethod.COSINE:
-        return feather_cos(mask, width)
-    elif method == FeatheringMethod.SIGMOID:
-        return feather_sigmoid(mask, width)
-    elif method == FeatheringMethod.EASE_OUT_POWER:
-        return feather_ease_out_power(mask, width)
-    elif method == FeatheringMethod.EASE_OUT_EXP:
-        return feather_ease_out_exp(mask, width)
+        alpha[roi] = sub_mask
+    elif method in FEATHER_PROFILES:
+        alpha[roi] = feather_lut(sub_mask, method, width)
+    else:
+        raise ValueError(f"Unknown feathering method: {method}")
+
+    return alpha
+
+
+def _smooth_roi(sub_mask: np.ndarray, smooth_radius: int) -> np.ndarray:
+    """Open -> close on a 0/1 uint8 scratch copy of the ROI, ping-ponging two buffers."""
+    smoothed = _scratch("smoothed", sub_mask.shape, np.uint8)
+    opened = _scratch("opened", sub_mask.shape, np.uint8)
+    np.not_equal(sub_mask, 0, out=smoothed.view(np.bool_))
+    se = _disk_kernel(smooth_radius)
+    cv2.morphologyEx(smoothed, cv2.MORPH_OPEN, se, dst=opened)
+    cv2.morphologyEx(opened, cv2.MORPH_CLOSE, se, dst=smoothed)
+    return smoothed
+
+
+# Output rows per strip of the fused kernels. Each strip is smoothed and
+# transformed with a halo of rows around it, so results are identical to
+# processing the whole ROI while scratch memory stays proportional to
+# (STRIP_ROWS + 2 * halo) * ROI width.
+STRIP_ROWS = 128
+
+
+def _roi_strips(
+    mask: np.ndarray, roi: Tuple[slice, slice], smooth_radius: int, reach: int
+) -> Iterator[Tuple[slice, np.ndarray, slice]]:
+    """
+    Smooth the ROI of a mask strip by strip.
+
+    Open/close makes a row depend on the input up to 4 * smooth_radius rows
+    away, and distances below reach only involve mask pixels fewer than
+    reach rows away. Each strip is therefore smoothed with both halos and
+    handed over with the distance halo; the ROI edges keep the border
+    handling of a single pass.
+
+    Yields:
+        (output rows relative to the ROI, smoothed boolean rows including the
+        distance halo, rows of that array belonging to the output)
+    """
+    rows, cols = roi
+    top, bottom = rows.start, rows.stop
+    smooth_halo = 4 * smooth_radius
+    for start in range(top, bottom, STRIP_ROWS):
+        stop = min(start + STRIP_ROWS, bottom)
+        work_start, work_stop = max(start - reach, top), min(stop + reach, bottom)
+        smooth_start = max(work_start - smooth_halo, top)
+        smooth_stop = min(work_stop + smooth_halo, bottom)
+        smoothed = _smooth_roi(mask[smooth_start:smooth_stop, cols], smooth_radius)
+        M = smoothed[work_start - smooth_start : work_stop - smooth_start].view(np.bool_)
+        yield (
+            slice(start - top, stop - top),
+            M,
+            slice(start - work_start, stop - work_start),
+        )
+
+
+def apply_feathering_u8(
+    mask: np.ndarray,
+    method: FeatheringMethod,
+    width: float = 10.0,
+    smooth_radius: int = 4,
+    out: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Fused variant of apply_feathering with uint8 output.
+
+    Smoothing, distance transform and profile lookup run in place on
+    per-thread scratch buffers covering one row strip of the ROI at a time
+    (see STRIP_ROWS), and the table gather writes straight into the uint8
+    alpha buffer. Working memory is bounded by the strip size, not the
+    object size; the scipy backend also allocates internally, per strip.
+
+    Args:
+        mask: Binary or float mask array (0/1 or bool), 2D
+        method: FeatheringMethod enum specifying which feathering to apply
+        width: Feather width in pixels (default 10.0)
+        smooth_radius: Open/close disk radius in pixels (0 disables smoothing)
+        out: Optional preallocated uint8 buffer of the mask's shape
+
+    Returns:
+        uint8 alpha array (0-255); matches apply_feathering * 255 within rounding
+    """
+    if method != FeatheringMethod.NONE and method not in FEATHER_PROFILES:
+        raise ValueError(f"Unknown feathering method: {method}")
+
+    if out is None:
+        out = np.zeros(mask.shape, dtype=np.uint8)
     else:
+        out.fill(0)
+
+    # Same ROI reasoning as apply_feathering
+    pad = int(np.ceil(width)) + 2 * smooth_radius + 2
+    roi = _roi_slices(mask, pad)
+    if roi is None:
+        return out
+
+    alpha = out[roi]
+    if method == FeatheringMethod.NONE:
+        for rows, M, inner in _roi_strips(mask, roi, smooth_radius, 0):
+            np.multiply(M[inner], 255, out=alpha[rows], casting="unsafe")
+        _trim_scratch()
+        return out
+
+    lut = profile_lut_u8(method, width)
+    for rows, M, inner in _roi_strips(mask, roi, smooth_radius, int(np.ceil(width))):
+        # Trivial edge cases
+        if not M.any():
+            continue
+        if M.all():
+            alpha[rows] = 255
+            continue
+        np.take(lut, _lut_index(M, len(lut) - 1, width, inner), out=alpha[rows])
+    _trim_scratch()
+    return out
+
+
+# ----# Cached distance fields
+#
+# Smoothing and the distance transform do not depend on the feathering
+# profile, only on the mask, the smoothing radius and how far the ramp can
+# reach. Keeping the clipped squared distances turns a change of method, or
+# of width within the band, into a single table gather.
+
+
+@dataclass
+class DistanceField:
+    """Squared outside distance of a smoothed mask, clipped to band², over its ROI."""
+
+    shape: Tuple[int, int]
+    roi: Optional[Tuple[slice, slice]]  # None when the mask is empty
+    band: int
+    d2: np.ndarray  # uint16, exact integer squared distances
+
+    @property
+    def nbytes(self) -> int:
+        return self.d2.nbytes
+
+
+MAX_DISTANCE_FIELD_BAND = 255  # band² must fit in uint16
+
+
+def distance_field(mask: np.ndarray, smooth_radius: int = 4, band: float = 32) -> DistanceField:
+    """
+    Smooth a mask and compute its band-clipped squared distance field.
+
+    Args:
+        mask: Binary or float mask array (0/1 or bool), 2D
+        smooth_radius: Open/close disk radius in pixels (0 disables smoothing)
+        band: Largest feather width the field can serve, in pixels
+
+    Returns:
+        DistanceField usable with feather_distance_field for any width <= band
+
+    Raises:
+        ValueError: If band exceeds MAX_DISTANCE_FIELD_BAND
+    """
+    band = int(np.ceil(band))
+    if not 0 < band <= MAX_DISTANCE_FIELD_BAND:
+        raise ValueError(f"Distance field band must be in (0, {MAX_DISTANCE_FIELD_BAND}]")
+    cap = band * band
+
+    # Same ROI reasoning as apply_feathering, for the widest servable ramp
+    roi = _roi_slices(mask, band + 2 * smooth_radius + 2)
+    if roi is None:
+        return DistanceField(mask.shape, None, band, np.empty((0, 0), dtype=np.uint16))
+
+    field = np.empty((roi[0].stop - roi[0].start, roi[1].stop - roi[1].start), dtype=np.uint16)
+    for rows, M, inner in _roi_strips(mask, roi, smooth_radius, band):
+        if not M.any():
+            field[rows] = cap
+            continue
+        d2 = DISTANCE_BACKENDS[_distance_backend](M, band)[inner]
+        np.minimum(d2, cap, out=d2)
+        if d2.dtype.kind == "f":
+            np.rint(d2, out=d2)
+        np.copyto(field[rows], d2, casting="unsafe")
+    _trim_scratch()
+    return DistanceField(mask.shape, roi, band, field)
+
+
+def feather_distance_field(
+    field: DistanceField,
+    method: FeatheringMethod,
+    width: float = 10.0,
+    out: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Feather from a precomputed distance field: one lookup-table gather.
+
+    Gives the same result as apply_feathering_u8 with the smoothing radius
+    the field was computed with.
+
+    Args:
+        field: Result of distance_field
+        method: FeatheringMethod enum specifying which feathering to apply
+        width: Feather width in pixels, at most field.band
+        out: Optional preallocated uint8 buffer of the mask's shape
+
+    Returns:
+        uint8 alpha array (0-255)
+
+    Raises:
+        ValueError: If the method is unknown or width exceeds the field's band
+    """
+    if method != FeatheringMethod.NONE and method not in FEATHER_PROFILES:
         raise ValueError(f"Unknown feathering method: {method}")
+    if width > field.band:
+        raise ValueError(f"Width {width} exceeds the distance field band {field.band}")
+
+    if out is None:
+        out = np.zeros(field.shape, dtype=np.uint8)
+    else:
+        out.fill(0)
+    if field.roi is None:
+        return out
+
+    alpha = out[field.roi]
+    if method == FeatheringMethod.NONE:
+        np.equal(field.d2, 0, out=alpha.view(np.bool_))
+        np.multiply(alpha, 255, out=alpha)
+        return out
+
+    lut = profile_lut_u8(method, width)
+    for start in range(0, field.d2.shape[0], STRIP_ROWS):
+        rows = slice(start, start + STRIP_ROWS)
+        index = _scratch("lut_index", field.d2[rows].shape, np.uint16)
+        np.minimum(field.d2[rows], len(lut) - 1, out=index)
+        np.take(lut, index, out=alpha[rows])
+    _trim_scratch()
+    return out
 
 
 # --- Example usage ---
@@ -0,0 +1,80 @@
+"""Upsampling of SAM's low-resolution mask logits, restricted to the mask ROI."""
+
+import math
+from typing import Tuple
+
+import cv2
+import numpy as np
+
+from .mask_refinement_service import nonzero_bbox
+
+# The mask decoder predicts 256x256 logits for the 1024x1024 padded encoder input
+LOW_RES_SCALE = 4
+
+
+def upsample_mask_roi(
+    logits: np.ndarray,
+    input_size: Tuple[int, int],
+    original_size: Tuple[int, int],
+    threshold: float = 0.0,
+) -> np.ndarray:
+    """
+    Threshold low-resolution SAM logits at full resolution, only inside the mask bbox.
+
+    SamPredictor upsamples the logits of every candidate to the padded input
+    size and then to the original size before thresholding, which costs two
+    full-size float passes per candidate. Here the bbox is found on the
+    256x256 logits, and only that region is bilinearly resampled (in a single
+    affine warp from original pixels to logit pixels) and thresholded.
+
+    Args:
+        logits: Low-resolution mask logits (h, w), float32
+        input_size: (height, width) of the resized image fed to the encoder
+        original_size: (height, width) of the original image
+        threshold: Logit threshold (SAM uses 0.0)
+
+    Returns:
+        Boolean mask of original_size
+    """
+    height, width = original_size
+    mask = np.zeros((height, width), dtype=bool)
+
+    # Rows/columns past the resized image only hold encoder padding
+    low_h = min(logits.shape[0], math.ceil(input_size[0] / LOW_RES_SCALE))
+    low_w = min(logits.shape[1], math.ceil(input_size[1] / LOW_RES_SCALE))
+    bbox = nonzero_bbox(logits[:low_h, :low_w] > threshold)
+    if bbox is None:
+        return mask
+    bx_min, by_min, bx_max, by_max = bbox
+
+    # Original pixel x samples logit coordinate sx * (x + 0.5) - 0.5
+    # (half-pixel centers, as in F.interpolate(align_corners=False))
+    sx = input_size[1] / (LOW_RES_SCALE * width)
+    sy = input_size[0] / (LOW_RES_SCALE * height)
+
+    # Interpolated values can stay above the threshold for up to one logit
+    # pixel beyond the positive ones
+    x_min = max(math.floor((bx_min - 1 + 0.5) / sx - 0.5), 0)
+    x_max = min(math.ceil((bx_max + 0.5) / sx - 0.5) + 1, width)
+    y_min = max(math.floor((by_min - 1 + 0.5) / sy - 0.5), 0)
+    y_max = min(math.ceil((by_max + 0.5) / sy - 0.5) + 1, height)
+    if x_min >= x_max or y_min >= y_max:
+        return mask
+
+    # Affine map from crop pixels to logit pixels
+    transform = np.array(
+        [
+            [sx, 0.0, sx * (x_min + 0.5) - 0.5],
+            [0.0, sy, sy * (y_min + 0.5) - 0.5],
+        ],
+        dtype=np.float64,
+    )
+    crop = cv2.warpAffine(
+        np.ascontiguousarray(logits, dtype=np.float32),
+        transform,
+        (x_max - x_min, y_max - y_min),
+        flags=cv2.INTER_LINEAR | cv2.WARP_INVERSE_MAP,
+        borderMode=cv2.BORDER_REPLICATE,
+    )
+    np.greater(crop, threshold, out=mask[y_min:y_max, x_min:x_max])
+    return mask
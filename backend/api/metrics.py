@@ -0,0 +1,77 @@
+"""Runtime metrics: event-loop responsiveness, cache and pool counters."""
+
+import asyncio
+from collections import deque
+from typing import Callable, Dict
+
+import numpy as np
+
+# Stats providers for caches, keyed by name (e.g. "uploads", "embeddings")
+_cache_stats: Dict[str, Callable[[], dict]] = {}
+
+
+def register_cache(name: str, stats: Callable[[], dict]) -> None:
+    """Expose a cache's counters on the metrics endpoint."""
+    _cache_stats[name] = stats
+
+
+def cache_stats() -> Dict[str, dict]:
+    """Return current counters of every registered cache."""
+    return {name: stats() for name, stats in _cache_stats.items()}
+
+
+# Stats providers for resource pools, keyed by name (e.g. "sam_encoder")
+_pool_stats: Dict[str, Callable[[], dict]] = {}
+
+
+def register_pool(name: str, stats: Callable[[], dict]) -> None:
+    """Expose a pool's utilization counters on the metrics endpoint."""
+    _pool_stats[name] = stats
+
+
+def pool_stats() -> Dict[str, dict]:
+    """Return current counters of every registered pool."""
+    return {name: stats() for name, stats in _pool_stats.items()}
+
+
+class EventLoopLagMonitor:
+    """
+    Measures how late the event loop wakes up from a fixed-interval sleep.
+
+    Any blocking work on the loop (e.g. PNG encoding in a handler) shows up
+    directly as lag, delaying every other request and WebSocket message.
+    """
+
+    def __init__(self, interval: float = 0.05, window: int = 1200):
+        """
+        Args:
+            interval: Seconds between probes
+            window: Number of most recent samples kept for percentiles
+        """
+        self.interval = interval
+        self._samples: deque = deque(maxlen=window)
+
+    async def run(self) -> None:
+        """Probe the running loop until cancelled."""
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = loop.time() - start - self.interval
+            self._samples.append(max(lag, 0.0))
+
+    def stats(self) -> Dict[str, float]:
+        """Return lag percentiles in milliseconds over the sample window."""
+        if not self._samples:
+            return {"samples": 0, "p50_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+        samples_ms = np.fromiter(self._samples, dtype=np.float64) * 1000.0
+        return {
+            "samples": int(samples_ms.size),
+            "p50_ms": float(np.percentile(samples_ms, 50)),
+            "p99_ms": float(np.percentile(samples_ms, 99)),
+            "max_ms": float(samples_ms.max()),
+        }
+
+
+# Global monitor, started with the app
+event_loop_lag_monitor = EventLoopLagMonitor()
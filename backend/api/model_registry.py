@@ -0,0 +1,131 @@
+"""Registry of segmentation models that share SAM's prompt decoder contract."""
+
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Mapping
+
+import torch
+
+# A checkpoint's state dict, parameter name -> tensor
+StateDict = Mapping[str, Any]
+
+
+@dataclass(frozen=True)
+class ModelSpec:
+    """
+    How to recognize and build one model architecture.
+
+    Any model can be registered as long as it exposes segment_anything's Sam
+    interface, so SamPredictor, the ONNX export and the service work on it
+    unchanged: an image_encoder with img_size that maps a (1, 3, 1024, 1024)
+    image to (1, 256, 64, 64) embeddings, SAM's prompt_encoder and
+    mask_decoder, preprocess, postprocess_masks and mask_threshold.
+    Distilled variants that swap in a lighter encoder (e.g. TinyViT in
+    MobileSAM) keep that contract.
+
+    Attributes:
+        name: Model type, as accepted by SAM_MODEL_TYPE
+        matches: Whether a checkpoint's state dict belongs to this architecture
+        build: Creates the model with uninitialized weights
+    """
+
+    name: str
+    matches: Callable[[StateDict], bool]
+    build: Callable[[], torch.nn.Module]
+
+
+# Registered architectures, keyed by name; detection tries them in order
+_models: Dict[str, ModelSpec] = {}
+
+
+def register_model(spec: ModelSpec) -> None:
+    """Make an architecture available for detection and SAM_MODEL_TYPE."""
+    _models[spec.name] = spec
+
+
+def _vit_width(state_dict: StateDict) -> int:
+    """Embedding width of a ViT image encoder (its patch embedding's output channels)."""
+    weight = state_dict.get("image_encoder.patch_embed.proj.weight")
+    return weight.shape[0] if weight is not None else 0
+
+
+def _segment_anything_vit(name: str, width: int) -> ModelSpec:
+    def build() -> torch.nn.Module:
+        from segment_anything import sam_model_registry
+
+        return sam_model_registry[name](checkpoint=None)
+
+    return ModelSpec(name, lambda state_dict: _vit_width(state_dict) == width, build)
+
+
+def _build_mobile_sam() -> torch.nn.Module:
+    # Optional: pip install git+https://github.com/ChaoningZhang/MobileSAM.git
+    from mobile_sam import sam_model_registry
+
+    return sam_model_registry["vit_t"](checkpoint=None)
+
+
+register_model(_segment_anything_vit("vit_b", 768))
+register_model(_segment_anything_vit("vit_l", 1024))
+register_model(_segment_anything_vit("vit_h", 1280))
+# MobileSAM: TinyViT encoder distilled from ViT-H, SAM's decoder
+register_model(
+    ModelSpec(
+        "vit_t",
+        lambda state_dict: "image_encoder.patch_embed.seq.0.c.weight" in state_dict,
+        _build_mobile_sam,
+    )
+)
+
+
+def available_models() -> List[str]:
+    """Names of the registered architectures."""
+    return list(_models)
+
+
+def detect_model_type(state_dict: StateDict) -> str:
+    """
+    Identify the architecture of a checkpoint from its parameters.
+
+    Raises:
+        ValueError: If no registered architecture matches
+    """
+    for spec in _models.values():
+        if spec.matches(state_dict):
+            return spec.name
+    raise ValueError(
+        f"Unrecognized SAM checkpoint; known model types: {', '.join(available_models())}"
+    )
+
+
+def _load_state_dict(checkpoint: str) -> StateDict:
+    with open(checkpoint, "rb") as f:
+        return torch.load(f, map_location="cpu")
+
+
+def load_model(checkpoint: str, model_type: str = "auto") -> torch.nn.Module:
+    """
+    Build a model and load a checkpoint into it, reading the file once.
+
+    Args:
+        checkpoint: Path to a state dict checkpoint
+        model_type: Registered name, or "auto" to detect it from the checkpoint
+
+    Returns:
+        The model in eval mode on CPU; its type name is set as model_type
+
+    Raises:
+        ValueError: If model_type is unknown or cannot be detected
+    """
+    state_dict = _load_state_dict(checkpoint)
+    if model_type == "auto":
+        model_type = detect_model_type(state_dict)
+    elif model_type not in _models:
+        raise ValueError(
+            f"Unknown SAM model type: {model_type}; known: {', '.join(available_models())}"
+        )
+
+    model = _models[model_type].build()
+    model.load_state_dict(state_dict)
+    model.eval()
+    model.model_type = model_type
+    return model
@@ -0,0 +1,272 @@
+"""ONNX Runtime backend for the SAM image encoder and prompt decoder."""
+
+import inspect
+import os
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+from segment_anything.utils.transforms import ResizeLongestSide
+
+# Normalization applied by Sam.preprocess (identical for every SAM checkpoint)
+PIXEL_MEAN = np.array([123.675, 116.28, 103.53], dtype=np.float32)
+PIXEL_STD = np.array([58.395, 57.12, 57.375], dtype=np.float32)
+
+IMAGE_SIZE = 1024  # Side of the padded encoder input
+MASK_THRESHOLD = 0.0
+
+ENCODER_FILENAME = "encoder.onnx"
+DECODER_FILENAME = "decoder.onnx"
+ONNX_OPSET = 17
+
+# torch >= 2.9 defaults to the dynamo exporter, which rejects dynamic_axes;
+# these graphs are traced with the TorchScript exporter on every version
+_EXPORT_OPTIONS = (
+    {"dynamo": False} if "dynamo" in inspect.signature(torch.onnx.export).parameters else {}
+)
+
+
+class _EncoderGraph(torch.nn.Module):
+    """Image encoder on a normalized, padded (1, 3, 1024, 1024) image."""
+
+    def __init__(self, sam):
+        super().__init__()
+        self.image_encoder = sam.image_encoder
+
+    def forward(self, image: torch.Tensor) -> torch.Tensor:
+        return self.image_encoder(image)
+
+
+class _DecoderGraph(torch.nn.Module):
+    """
+    Prompt encoder plus mask decoder for point prompts.
+
+    Returns all four mask tokens; the caller slices them the way
+    MaskDecoder.forward does for multimask_output. Point embedding avoids
+    boolean index assignment so that the number of points stays dynamic
+    in the exported graph (as in segment_anything's SamOnnxModel).
+    """
+
+    def __init__(self, sam):
+        super().__init__()
+        self.prompt_encoder = sam.prompt_encoder
+        self.mask_decoder = sam.mask_decoder
+
+    def _embed_points(self, point_coords: torch.Tensor, point_labels: torch.Tensor) -> torch.Tensor:
+        prompt_encoder = self.prompt_encoder
+        point_coords = (point_coords + 0.5) / IMAGE_SIZE
+        point_embedding = prompt_encoder.pe_layer._pe_encoding(point_coords)
+        point_labels = point_labels.unsqueeze(-1).expand_as(point_embedding)
+
+        point_embedding = point_embedding * (point_labels != -1)
+        point_embedding = point_embedding + prompt_encoder.not_a_point_embed.weight * (
+            point_labels == -1
+        )
+        for i in range(prompt_encoder.num_point_embeddings):
+            point_embedding = point_embedding + prompt_encoder.point_embeddings[i].weight * (
+                point_labels == i
+            )
+        return point_embedding
+
+    def forward(
+        self, image_embeddings: torch.Tensor, point_coords: torch.Tensor, point_labels: torch.Tensor
+    ) -> Tuple[torch.Tensor, torch.Tensor]:
+        sparse_embedding = self._embed_points(point_coords, point_labels)
+        dense_embedding = self.prompt_encoder.no_mask_embed.weight.reshape(1, -1, 1, 1).expand(
+            1, -1, *image_embeddings.shape[-2:]
+        )
+        return self.mask_decoder.predict_masks(
+            image_embeddings=image_embeddings,
+            image_pe=self.prompt_encoder.get_dense_pe(),
+            sparse_prompt_embeddings=sparse_embedding,
+            dense_prompt_embeddings=dense_embedding,
+        )
+
+
+def export_onnx(sam, export_dir: Path) -> None:
+    """
+    Export a loaded SAM model's encoder and decoder to export_dir.
+
+    Weights above the 2 GB protobuf limit (ViT-H) are written by torch as
+    external data files next to the graph, which is why every checkpoint
+    gets its own directory.
+    """
+    export_dir.mkdir(parents=True, exist_ok=True)
+    embed_dim = sam.prompt_encoder.embed_dim
+    embed_size = sam.prompt_encoder.image_embedding_size
+
+    with torch.no_grad():
+        torch.onnx.export(
+            _EncoderGraph(sam),
+            (torch.zeros(1, 3, IMAGE_SIZE, IMAGE_SIZE),),
+            str(export_dir / ENCODER_FILENAME),
+            input_names=["image"],
+            output_names=["image_embeddings"],
+            opset_version=ONNX_OPSET,
+            **_EXPORT_OPTIONS,
+        )
+        torch.onnx.export(
+            _DecoderGraph(sam),
+            (
+                torch.zeros(1, embed_dim, *embed_size),
+                torch.zeros(1, 2, 2),
+                torch.tensor([[1.0, -1.0]]),
+            ),
+            str(export_dir / DECODER_FILENAME),
+            input_names=["image_embeddings", "point_coords", "point_labels"],
+            output_names=["low_res_masks", "iou_predictions"],
+            dynamic_axes={"point_coords": {1: "num_points"}, "point_labels": {1: "num_points"}},
+            opset_version=ONNX_OPSET,
+            **_EXPORT_OPTIONS,
+        )
+
+
+def _session(path: Path, threads: int):
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    options.intra_op_num_threads = threads
+    options.inter_op_num_threads = 1
+    return ort.InferenceSession(str(path), options, providers=["CPUExecutionProvider"])
+
+
+def normalize_and_pad(image: np.ndarray, image_size: int = IMAGE_SIZE) -> np.ndarray:
+    """
+    Sam.preprocess in numpy: normalize a resized RGB image and zero-pad it
+    to (1, 3, image_size, image_size), bottom and right.
+    """
+    height, width = image.shape[:2]
+    batch = np.zeros((1, 3, image_size, image_size), dtype=np.float32)
+    batch[0, :, :height, :width] = ((image - PIXEL_MEAN) / PIXEL_STD).transpose(2, 0, 1)
+    return batch
+
+
+def pad_points(coords: np.ndarray, labels: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Batch point prompts and append the padding point PromptEncoder adds
+    when no box is given.
+    """
+    coords = np.concatenate([coords, np.zeros((1, 2))], axis=0)[None].astype(np.float32)
+    labels = np.concatenate([labels, [-1]], axis=0)[None].astype(np.float32)
+    return coords, labels
+
+
+class OnnxSam:
+    """
+    SAM encoder and decoder as ONNX Runtime sessions.
+
+    Exposes the parts of segment_anything's Sam that SAMService uses outside
+    the predictors (mask_threshold, postprocess_masks), so the rest of the
+    service is backend-agnostic. Sessions are safe to run from several
+    threads at once.
+    """
+
+    mask_threshold = MASK_THRESHOLD
+
+    def __init__(self, export_dir: Path, threads: int):
+        self.encoder = _session(export_dir / ENCODER_FILENAME, threads)
+        self.decoder = _session(export_dir / DECODER_FILENAME, threads)
+        self.img_size = IMAGE_SIZE
+
+    @classmethod
+    def from_checkpoint(
+        cls, checkpoint: str, model_type: str, onnx_dir: Path, threads: int
+    ) -> "OnnxSam":
+        """
+        Load the exports of a checkpoint, exporting them first if missing.
+
+        Args:
+            checkpoint: Path to the PyTorch SAM checkpoint
+            model_type: Registered model type, or "auto" (see model_registry)
+            onnx_dir: Directory holding one export directory per checkpoint
+            threads: ONNX Runtime intra-op threads per session
+        """
+        export_dir = onnx_dir / Path(checkpoint).stem
+        if not (export_dir / ENCODER_FILENAME).exists() or not (export_dir / DECODER_FILENAME).exists():
+            from .model_registry import load_model
+
+            sam = load_model(checkpoint, model_type)
+            print(f"Exporting {sam.model_type} from {checkpoint} to ONNX in {export_dir}")
+            export_onnx(sam, export_dir)
+            del sam
+        return cls(export_dir, threads)
+
+    @staticmethod
+    def postprocess_masks(
+        masks: torch.Tensor, input_size: Tuple[int, ...], original_size: Tuple[int, ...]
+    ) -> torch.Tensor:
+        """Same upsampling as Sam.postprocess_masks."""
+        masks = F.interpolate(
+            masks, (IMAGE_SIZE, IMAGE_SIZE), mode="bilinear", align_corners=False
+        )
+        masks = masks[..., : input_size[0], : input_size[1]]
+        return F.interpolate(masks, original_size, mode="bilinear", align_corners=False)
+
+
+class OnnxPredictor:
+    """
+    Per-image state over an OnnxSam, with SamPredictor's image interface.
+
+    Holds features, original_size and input_size like SamPredictor, so the
+    service's pools, embedding cache and snapshot/restore work unchanged.
+    """
+
+    def __init__(self, model: OnnxSam):
+        self.model = model
+        self.transform = ResizeLongestSide(model.img_size)
+        self.device = "cpu"
+        self.reset_image()
+
+    def reset_image(self) -> None:
+        self.is_image_set = False
+        self.features: Optional[torch.Tensor] = None
+        self.original_size = None
+        self.input_size = None
+
+    def set_image(self, image: np.ndarray, image_format: str = "RGB") -> None:
+        """Run the encoder on an RGB uint8 image (H, W, 3)."""
+        self.reset_image()
+        input_image = self.transform.apply_image(image)
+        (features,) = self.model.encoder.run(None, {"image": normalize_and_pad(input_image)})
+        self.features = torch.from_numpy(features)
+        self.original_size = image.shape[:2]
+        self.input_size = input_image.shape[:2]
+        self.is_image_set = True
+
+    def predict_low_res(
+        self, input_points: np.ndarray, input_labels: np.ndarray, multimask: bool
+    ) -> Tuple[torch.Tensor, np.ndarray]:
+        """
+        Decode point prompts against the current image, without upsampling.
+
+        Returns:
+            Same as SAMService._predict_low_res
+        """
+        coords = self.transform.apply_coords(input_points.astype(np.float64), self.original_size)
+        point_coords, point_labels = pad_points(coords, input_labels)
+        low_res_masks, iou_predictions = self.model.decoder.run(
+            None,
+            {
+                "image_embeddings": self.features.numpy(),
+                "point_coords": point_coords,
+                "point_labels": point_labels,
+            },
+        )
+        # MaskDecoder.forward: token 0 is the single-mask output
+        selected = slice(1, None) if multimask else slice(0, 1)
+        return torch.from_numpy(low_res_masks[0, selected]), iou_predictions[0, selected]
+
+
+def default_threads(concurrency: int) -> int:
+    """
+    Intra-op threads per session when SAM_ONNX_THREADS is unset.
+
+    0 (ONNX Runtime's own default) for a single encoder; otherwise the CPUs
+    are split between the concurrent encoders.
+    """
+    if concurrency <= 1:
+        return 0
+    return max(1, (os.cpu_count() or 1) // concurrency)
@@ -0,0 +1,85 @@
+"""Pool of SAM predictors sharing one copy of the model weights."""
+
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+
+class PredictorPool:
+    """
+    Fixed set of predictor contexts, each checked out by one caller at a time.
+
+    Every predictor wraps the same model (weights are shared, not copied) but
+    holds its own per-image state (features, sizes), so concurrent requests
+    never see each other's image. Callers beyond the pool size queue in FIFO
+    order until a predictor is checked back in.
+    """
+
+    def __init__(self, model: Any, size: int, factory: Callable[[Any], Any]):
+        """
+        Args:
+            model: Loaded model shared by every predictor
+            size: Number of predictors (maximum concurrency)
+            factory: Builds a predictor around the model, e.g. SamPredictor
+        """
+        if size < 1:
+            raise ValueError("Predictor pool size must be at least 1")
+        self.size = size
+        self._idle: "queue.Queue[Any]" = queue.Queue()
+        for _ in range(size):
+            self._idle.put(factory(model))
+        self._lock = threading.Lock()
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_seconds = 0.0
+
+    def checkout(self, timeout: Optional[float] = None) -> Any:
+        """
+        Take an idle predictor, waiting for one if all are in use.
+
+        Raises:
+            TimeoutError: If none became idle within timeout seconds
+        """
+        start = time.monotonic()
+        try:
+            predictor = self._idle.get_nowait()
+            waited = False
+        except queue.Empty:
+            try:
+                predictor = self._idle.get(timeout=timeout)
+            except queue.Empty:
+                raise TimeoutError(f"No predictor available after {timeout}s") from None
+            waited = True
+
+        with self._lock:
+            self._checkouts += 1
+            if waited:
+                self._waits += 1
+                self._wait_seconds += time.monotonic() - start
+        return predictor
+
+    def checkin(self, predictor: Any) -> None:
+        """Return a predictor taken with checkout."""
+        self._idle.put(predictor)
+
+    @contextmanager
+    def predictor(self, timeout: Optional[float] = None) -> Iterator[Any]:
+        """Check out a predictor for the duration of a with block."""
+        predictor = self.checkout(timeout)
+        try:
+            yield predictor
+        finally:
+            self.checkin(predictor)
+
+    def stats(self) -> Dict[str, float]:
+        """Return utilization counters for monitoring."""
+        with self._lock:
+            return {
+                "size": self.size,
+                "idle": self._idle.qsize(),
+                "checkouts": self._checkouts,
+                "waits": self._waits,
+                "wait_seconds": round(self._wait_seconds, 3),
+            }
@@ -0,0 +1,45 @@
+"""Post-training quantization of the SAM image encoder for CPU inference."""
+
+from typing import Optional
+
+import torch
+
+# Modes accepted by SAM_QUANTIZE ("" keeps the fp32 encoder)
+QUANTIZE_MODES = ("", "int8")
+
+
+def quantize_image_encoder(sam: torch.nn.Module, mode: Optional[str]) -> torch.nn.Module:
+    """
+    Quantize the image encoder of a loaded SAM model in place.
+
+    "int8" applies dynamic quantization to every nn.Linear of the ViT
+    encoder (attention qkv/proj and the MLPs, which hold nearly all its
+    weights and FLOPs): weights are stored as int8, activations are
+    quantized per batch at run time. The prompt encoder and mask decoder
+    are small and stay fp32.
+
+    Args:
+        sam: Loaded SAM model on CPU
+        mode: One of QUANTIZE_MODES; empty or None leaves the model unchanged
+
+    Returns:
+        The same model, for chaining
+
+    Raises:
+        ValueError: If mode is not supported
+    """
+    mode = (mode or "").lower()
+    if mode not in QUANTIZE_MODES:
+        raise ValueError(f"Unknown quantization mode: {mode}")
+    if not mode:
+        return sam
+
+    # fbgemm is the x86 kernel library; ARM hosts only ship qnnpack
+    engines = torch.backends.quantized.supported_engines
+    if "fbgemm" not in engines and "qnnpack" in engines:
+        torch.backends.quantized.engine = "qnnpack"
+
+    sam.image_encoder = torch.ao.quantization.quantize_dynamic(
+        sam.image_encoder, {torch.nn.Linear}, dtype=torch.qint8
+    )
+    return sam
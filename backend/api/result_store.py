@@ -0,0 +1,133 @@
+"""Server-side storage for mask results, served as binary resources."""
+
+import threading
+import uuid
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .cache import LRUCache
+from .mask_refinement_service import FeatheringMethod
+
+
+def new_result_id() -> str:
+    """Generate an ID for a result or a set of unrefined masks."""
+    return uuid.uuid4().hex
+
+
+@dataclass
+class RawMasks:
+    """Unrefined binary SAM candidates of one request, bit-packed."""
+
+    image_id: str
+    shape: Tuple[int, int]
+    scores: List[float]
+    packed: List[np.ndarray]
+
+    @classmethod
+    def from_masks(
+        cls, image_id: str, masks: List[np.ndarray], scores: List[float], shape: Tuple[int, int]
+    ) -> "RawMasks":
+        return cls(
+            image_id=image_id,
+            shape=shape,
+            scores=list(scores),
+            packed=[np.packbits(mask, axis=None) for mask in masks],
+        )
+
+    def mask(self, index: int) -> np.ndarray:
+        """Unpack one candidate to a boolean (H, W) mask."""
+        count = self.shape[0] * self.shape[1]
+        return np.unpackbits(self.packed[index], count=count).view(bool).reshape(self.shape)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(packed.nbytes for packed in self.packed)
+
+
+@dataclass(frozen=True)
+class RefinementParams:
+    """Smoothing and feathering applied when a candidate is materialized."""
+
+    method: FeatheringMethod
+    width: float
+    smooth_radius: int
+
+
+@dataclass
+class CandidateResult:
+    """
+    One SAM candidate: its score, the bbox of its unrefined mask, and
+    encoded images keyed by file name.
+
+    files stays empty until the candidate is first fetched; it is then
+    replaced as a whole, under lock, so readers never see a partial dict.
+    """
+
+    score: float
+    bbox: Optional[Tuple[int, int, int, int]] = None  # (x_min, y_min, x_max, y_max)
+    files: Dict[str, bytes] = field(default_factory=dict)
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(len(data) for data in self.files.values())
+
+
+@dataclass
+class StoredResult:
+    """All candidates produced by one mask generation request."""
+
+    image_id: str
+    candidates: List[CandidateResult]
+    width: int
+    height: int
+    mask_filename: str = "mask.png"
+    mask_format: str = "L"
+    raw_id: Optional[str] = None  # Identity of the unrefined masks, shared by re-refinements
+    raw: Optional[RawMasks] = None
+    refinement: Optional[RefinementParams] = None
+
+    @property
+    def nbytes(self) -> int:
+        raw_bytes = self.raw.nbytes if self.raw is not None else 0
+        return raw_bytes + sum(candidate.nbytes for candidate in self.candidates)
+
+
+class ResultStore:
+    """LRU store of results keyed by a generated result ID."""
+
+    def __init__(self, max_bytes: int, ttl: Optional[float] = None):
+        self._cache = LRUCache(max_bytes, ttl=ttl)
+
+    def put(self, result: StoredResult) -> str:
+        """Store a result and return its new ID."""
+        result_id = new_result_id()
+        self._cache.put(result_id, result, result.nbytes)
+        return result_id
+
+    def update(self, result_id: str, result: StoredResult) -> None:
+        """
+        Re-account a stored result whose candidates were materialized.
+
+        A result evicted or expired in the meantime stays gone, and a stored
+        one keeps its original expiry.
+        """
+        self._cache.resize(result_id, result.nbytes)
+
+    def get(self, result_id: str) -> StoredResult:
+        """
+        Return a stored result.
+
+        Raises:
+            KeyError: If the result is unknown, evicted or expired
+        """
+        result = self._cache.get(result_id)
+        if result is None:
+            raise KeyError(result_id)
+        return result
+
+    def stats(self) -> Dict[str, int]:
+        """Return cache counters for monitoring."""
+        return self._cache.stats()
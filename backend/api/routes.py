@@ -1,152 +1,242 @@
 import asyncio
-import base64
+import hashlib
 import io
-import uuid
+from concurrent.futures import ThreadPoolExecutor
+from enum import Enum
+from functools import partial
 from pathlib import Path
-from typing import Dict, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 
+import cv2
 import numpy as np
-from fastapi import APIRouter, File, Form, HTTPException, UploadFile, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, File, Form, HTTPException, Request, Response, UploadFile, WebSocket, WebSocketDisconnect
 from PIL import Image
 
+from .consts import (
+    DECODED_IMAGE_CACHE_MAX_BYTES,
+    DECODER_POOL_SIZE,
+    FEATHER_METHOD,
+    FEATHER_SMOOTH_RADIUS,
+    FEATHER_WIDTH,
+    MAX_FEATHER_WIDTH,
+    MAX_SMOOTH_RADIUS,
+    POSTPROCESS_WORKERS,
+    RESULT_STORE_MAX_BYTES,
+    RESULT_TTL_SECONDS,
+    UPLOAD_STORE_MAX_BYTES,
+    UPLOAD_TTL_SECONDS,
+)
+from .image_store import ImageEvictedError, ImageStore
+from .mask_refinement_service import FeatheringMethod, nonzero_bbox
+from .metrics import cache_stats, event_loop_lag_monitor, pool_stats, register_cache
+from .result_store import (
+    CandidateResult,
+    RawMasks,
+    RefinementParams,
+    ResultStore,
+    StoredResult,
+    new_result_id,
+)
+
 router = APIRouter()
 
 # In-memory storage for uploaded images and job status
-uploaded_images: Dict[str, bytes] = {}
+uploaded_images = ImageStore(
+    UPLOAD_STORE_MAX_BYTES,
+    ttl=UPLOAD_TTL_SECONDS,
+    decoded_max_bytes=DECODED_IMAGE_CACHE_MAX_BYTES,
+)
 job_status: Dict[str, dict] = {}
 job_connections: Dict[str, list] = {}
 
+results_store = ResultStore(RESULT_STORE_MAX_BYTES, ttl=RESULT_TTL_SECONDS)
+
+register_cache("uploads", uploaded_images.stats)
+register_cache("results", results_store.stats)
+
+# Decoder-only requests get their own small pool so they never queue behind
+# encoder passes running on the default executor; one thread per pooled
+# decoder predictor
+_decoder_executor = ThreadPoolExecutor(
+    max_workers=DECODER_POOL_SIZE, thread_name_prefix="sam-decoder"
+)
+
+# Compositing and PNG encoding hold the GIL for long stretches; keep them on
+# their own pool so the event loop stays responsive
+_postprocess_executor = ThreadPoolExecutor(
+    max_workers=POSTPROCESS_WORKERS, thread_name_prefix="postprocess"
+)
+
+
+class MaskFormat(str, Enum):
+    """Encodings for the full-size mask resource."""
+
+    GRAYSCALE = "L"  # 8-bit grayscale PNG
+    BILEVEL = "1"  # 1-bit PNG, lossless for unfeathered masks
+    RAW = "raw"  # Uncompressed row-major uint8 bytes (H, W)
+
+
+_MASK_FILENAMES = {
+    MaskFormat.GRAYSCALE: "mask.png",
+    MaskFormat.BILEVEL: "mask.png",
+    MaskFormat.RAW: "mask.raw",
+}
+
+_MEDIA_TYPES = {".png": "image/png", ".raw": "application/octet-stream"}
+
+
+def _default_mask_format(method: FeatheringMethod) -> MaskFormat:
+    """Cheapest format that loses no information for masks refined with this method."""
+    if method == FeatheringMethod.NONE:
+        return MaskFormat.BILEVEL
+    return MaskFormat.GRAYSCALE
+
 
 # Helper functions for mask encoding
 def _get_mask_bbox(mask: np.ndarray) -> Tuple[int, int, int, int]:
     """
     Get bounding box of mask.
 
+    uint8/bool masks use OpenCV's single-pass scan; float masks reduce rows
+    once and then only scan the occupied row band for columns, without
+    materializing a full-size boolean copy.
+
     Returns:
         (x_min, y_min, x_max, y_max)
     """
-    rows = np.any(mask > 0, axis=1)
-    cols = np.any(mask > 0, axis=0)
-
-    if not rows.any() or not cols.any():
+    height, width = mask.shape[:2]
+
+    if mask.dtype == np.bool_:
+        mask = mask.view(np.uint8)
+    if mask.dtype == np.uint8:
+        x, y, w, h = cv2.boundingRect(np.ascontiguousarray(mask))
+        if w == 0 or h == 0:
+            # Empty mask, return full image bounds
+            return 0, 0, width, height
+        return x, y, x + w, y + h
+
+    # Values are in [0, 1], so "nonzero" is the same as "> 0"
+    bbox = nonzero_bbox(mask)
+    if bbox is None:
         # Empty mask, return full image bounds
-        return 0, 0, mask.shape[1], mask.shape[0]
+        return 0, 0, width, height
 
-    y_min, y_max = np.where(rows)[0][[0, -1]]
-    x_min, x_max = np.where(cols)[0][[0, -1]]
+    return bbox
 
-    return int(x_min), int(y_min), int(x_max + 1), int(y_max + 1)
 
+def _to_alpha(mask: np.ndarray) -> np.ndarray:
+    """
+    Return the mask as uint8 alpha (0-255).
 
-def _create_masked_image(image: Image.Image, mask: np.ndarray) -> str:
+    Refined masks already are uint8 and pass through without a copy; float
+    masks in [0, 1] and boolean masks are converted.
+    """
+    if mask.dtype == np.uint8:
+        return mask
+    if mask.dtype == np.bool_:
+        return mask.view(np.uint8) * np.uint8(255)
+    return (mask * 255).astype(np.uint8)
+
+
+def _create_masked_image(image: np.ndarray, mask: np.ndarray) -> bytes:
     """
     Create RGBA image with mask as alpha channel, cropped to bbox.
 
+    The bbox is found first and only that region is composited, so the cost
+    scales with the object size rather than the image size.
+
     Args:
-        image: Original PIL image
-        mask: Float numpy array with values in [0, 1]
+        image: Original RGB uint8 array (H, W, 3), used read-only
+        mask: uint8 alpha array (0-255), or a float array with values in [0, 1]
 
     Returns:
-        Base64 encoded data URI
+        PNG bytes
     """
-    # Convert to RGBA
-    if image.mode != "RGBA":
-        image_rgba = image.convert("RGBA")
-    else:
-        image_rgba = image.copy()
-
-    # Apply mask as alpha channel (scale to 0-255)
-    alpha = Image.fromarray((mask * 255).astype(np.uint8), mode="L")
-    image_rgba.putalpha(alpha)
+    x_min, y_min, x_max, y_max = _get_mask_bbox(mask)
+    mask_crop = _to_alpha(mask[y_min:y_max, x_min:x_max])
 
-    # Get bounding box and crop
-    bbox = _get_mask_bbox(mask)
-    cropped = image_rgba.crop(bbox)
+    # Composite RGB and alpha straight into a bbox-sized RGBA buffer
+    rgba = np.empty((y_max - y_min, x_max - x_min, 4), dtype=np.uint8)
+    rgba[..., :3] = image[y_min:y_max, x_min:x_max]
+    # Apply mask as alpha channel
+    rgba[..., 3] = mask_crop
 
-    # Encode to base64
-    return _encode_image_base64(cropped)
+    return _encode_png(Image.fromarray(rgba, mode="RGBA"))
 
 
-def _create_mask_image(mask: np.ndarray, original_size: Tuple[int, int]) -> str:
+def _create_mask_image(
+    mask: np.ndarray, original_size: Tuple[int, int], mask_format: MaskFormat
+) -> bytes:
     """
-    Create RGB mask image with all channels equal (full size).
+    Encode the full-size mask in the requested format.
 
     Args:
-        mask: Float numpy array with values in [0, 1]
+        mask: uint8 alpha array (0-255), or a float array with values in [0, 1]
         original_size: (width, height) of original image
+        mask_format: Single-channel encoding to produce
 
     Returns:
-        Base64 encoded data URI
+        PNG bytes, or raw row-major uint8 bytes for MaskFormat.RAW
     """
-    # Convert to grayscale (0-255)
-    mask_gray = (mask * 255).astype(np.uint8)
-
-    # Stack to create RGB with all channels equal
-    mask_rgb = np.stack([mask_gray, mask_gray, mask_gray], axis=-1)
-
-    # Create PIL image
-    mask_image = Image.fromarray(mask_rgb, mode="RGB")
+    mask_gray = _to_alpha(mask)
+    if mask_format == MaskFormat.BILEVEL:
+        # Boolean arrays map to mode "1"
+        mask_image = Image.fromarray(mask_gray > 127)
+    else:
+        if mask_format == MaskFormat.RAW:
+            return mask_gray.tobytes()
+        # uint8 arrays map to mode "L"
+        mask_image = Image.fromarray(mask_gray)
 
     # Ensure correct size
     if mask_image.size != original_size:
         mask_image = mask_image.resize(original_size, Image.Resampling.NEAREST)
 
-    # Encode to base64
-    return _encode_image_base64(mask_image)
+    return _encode_png(mask_image)
 
 
-def _encode_image_base64(image: Image.Image) -> str:
+def _encode_png(image: Image.Image) -> bytes:
+    """Encode PIL image to PNG bytes."""
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def _get_uploaded_image(image_id: str, description: str = "Image") -> bytes:
     """
-    Encode PIL image to base64 data URI.
+    Fetch uploaded image bytes.
 
-    Returns:
-        Data URI string (data:image/png;base64,...)
+    Raises:
+        HTTPException: 404 if never uploaded, 410 if evicted or expired
     """
-    buffer = io.BytesIO()
-    image.save(buffer, format="PNG")
-    image_bytes = buffer.getvalue()
-    b64_string = base64.b64encode(image_bytes).decode("utf-8")
-    return f"data:image/png;base64,{b64_string}"
+    try:
+        return uploaded_images.get(image_id)
+    except ImageEvictedError:
+        raise HTTPException(
+            status_code=410, detail=f"{description} has expired, please upload it again"
+        )
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"{description} not found")
 
 
-@router.post("/upload/image")
-async def upload_image(
-    file: UploadFile = File(...),
-    image_type: str = Form("original")  # "original" or "mask"
-):
-    """Upload an image (original or mask)"""
-    if not file.content_type.startswith("image/"):
-        raise HTTPException(status_code=400, detail="File must be an image")
-    
-    # Generate unique ID for this image
-    image_id = str(uuid.uuid4())
-    
-    # Read and store image data
-    contents = await file.read()
-    uploaded_images[image_id] = contents
-    
-    return {
-        "image_id": image_id,
-        "type": image_type,
-        "filename": file.filename,
-        "size": len(contents)
-    }
+def _validate_top_k(top_k: Optional[int]) -> None:
+    """
+    Validate the top_k candidate selection form field.
 
+    Raises:
+        HTTPException: 400 if top_k is not positive
+    """
+    if top_k is not None and top_k < 1:
+        raise HTTPException(status_code=400, detail="top_k must be at least 1")
 
-@router.post("/run")
-async def run_inpainting(
-    original_image_id: str = Form(...),
-    mask_image_id: Optional[str] = Form(None),
-    points: str = Form("[]"),
-    labels: str = Form("[]")
-):
-    """Generate SAM masks synchronously"""
-    if original_image_id not in uploaded_images:
-        raise HTTPException(status_code=404, detail="Original image not found")
 
-    if mask_image_id and mask_image_id not in uploaded_images:
-        raise HTTPException(status_code=404, detail="Mask image not found")
+def _parse_prompts(points: str, labels: str) -> Tuple[List[Dict[str, int]], List[int]]:
+    """
+    Parse and validate the JSON-encoded points and labels form fields.
 
+    Raises:
+        HTTPException: 400 if the prompts are malformed
+    """
     # Parse and validate points
     try:
         import json
@@ -181,55 +271,429 @@ async def run_inpainting(
     except (json.JSONDecodeError, ValueError) as e:
         raise HTTPException(status_code=400, detail=f"Invalid points/labels format: {str(e)}")
 
-    # Process synchronously
+    return points_list, labels_list
+
+
+def _raw_mask_bbox(mask: np.ndarray) -> Optional[Tuple[int, int, int, int]]:
+    """Bounding box (x_min, y_min, x_max, y_max) of a boolean mask, or None if empty."""
+    x, y, w, h = cv2.boundingRect(mask.view(np.uint8))
+    if w == 0 or h == 0:
+        return None
+    return x, y, x + w, y + h
+
+
+def _build_result(
+    image_id: str,
+    image_size: Tuple[int, int],
+    raw_results: List[Dict[str, any]],
+    mask_format: MaskFormat,
+    refinement: RefinementParams,
+) -> StoredResult:
+    """
+    Store unrefined SAM masks as a result whose candidates materialize lazily.
+
+    Only bit-packing and a bbox scan run here; each candidate is refined and
+    encoded when one of its files is first fetched (see _materialize_candidate).
+
+    Args:
+        image_id: Uploaded image the masks belong to
+        image_size: (height, width) of the image
+        raw_results: Unrefined SAM candidates, highest score first
+        mask_format: Encoding of the full-size mask files
+        refinement: Smoothing and feathering to apply on materialization
+    """
+    height, width = image_size
+    masks = [result["mask"] for result in raw_results]
+    scores = [result["score"] for result in raw_results]
+    raw = RawMasks.from_masks(image_id, masks, scores, (height, width))
+    return StoredResult(
+        image_id=image_id,
+        candidates=[
+            CandidateResult(score=score, bbox=_raw_mask_bbox(mask))
+            for mask, score in zip(masks, scores)
+        ],
+        width=width,
+        height=height,
+        mask_filename=_MASK_FILENAMES[mask_format],
+        mask_format=mask_format.value,
+        raw_id=new_result_id(),
+        raw=raw,
+        refinement=refinement,
+    )
+
+
+def _materialize_candidate(result_id: str, result: StoredResult, index: int) -> CandidateResult:
+    """
+    Refine and encode one candidate of a stored result, once.
+
+    Raises:
+        ImageEvictedError: If the original image is no longer stored
+    """
+    from .mask_generation_service import get_mask_generation_service
+
+    candidate = result.candidates[index]
+    with candidate.lock:
+        # Another request may have materialized it while we waited
+        if candidate.files:
+            return candidate
+
+        image = uploaded_images.get_array(result.image_id)
+        params = result.refinement
+        mask = get_mask_generation_service().refine_candidate(
+            result.raw.mask(index),
+            index,
+            params.method,
+            params.width,
+            params.smooth_radius,
+            cache_key=result.raw_id,
+        )
+        mask_format = MaskFormat(result.mask_format)
+        candidate.files = {
+            # Create masked image (cropped to bbox)
+            "cutout.png": _create_masked_image(image, mask),
+            # Create single-channel mask (full size)
+            result.mask_filename: _create_mask_image(
+                mask, (result.width, result.height), mask_format
+            ),
+        }
+
+    # The encoded files now count against the store's budget
+    results_store.update(result_id, result)
+    return candidate
+
+
+def _result_response(request: Request, result_id: str, result: StoredResult) -> dict:
+    """Build the JSON response: result URLs, scores and bboxes, no pixel data."""
+
+    def file_url(candidate: int, filename: str) -> str:
+        return str(
+            request.url_for(
+                "get_result_file", result_id=result_id, candidate=candidate, filename=filename
+            )
+        )
+
+    return {
+        "result_id": result_id,
+        "width": result.width,
+        "height": result.height,
+        "results": [
+            {
+                "masked_image": file_url(i, "cutout.png"),
+                "mask": file_url(i, result.mask_filename),
+                "score": candidate.score,
+                "bbox": candidate.bbox,
+            }
+            for i, candidate in enumerate(result.candidates)
+        ],
+    }
+
+
+@router.post("/upload/image")
+async def upload_image(
+    file: UploadFile = File(...),
+    image_type: str = Form("original"),  # "original" or "mask"
+    precompute_embedding: bool = Form(True),
+):
+    """
+    Upload an image (original or mask).
+
+    Images are content-addressed: the image ID is the SHA-256 of the file, so
+    re-uploading the same file reuses the stored bytes and every cache keyed
+    by image ID. Original images are queued for SAM embedding in the
+    background, so the encoder runs while the user is still placing points.
+    """
+    if not file.content_type.startswith("image/"):
+        raise HTTPException(status_code=400, detail="File must be an image")
+
+    # Read image data and derive its content address
+    contents = await file.read()
+    if len(contents) > uploaded_images.max_bytes:
+        # The store would drop it, and every later request for the ID would 404
+        raise HTTPException(
+            status_code=413,
+            detail=f"Image is larger than the upload store ({uploaded_images.max_bytes} bytes)",
+        )
+    image_id = hashlib.sha256(contents).hexdigest()
+
+    deduplicated = image_id in uploaded_images
+    # Store even on a hit: re-putting restarts the TTL, so clients can keep
+    # an image alive by uploading it again
+    uploaded_images.put(image_id, contents)
+
+    embedding_scheduled = image_type == "original" and precompute_embedding
+    if embedding_scheduled:
+        from .embedding_worker import schedule_embedding
+
+        schedule_embedding(image_id, partial(uploaded_images.get_array, image_id))
+
+    return {
+        "image_id": image_id,
+        "type": image_type,
+        "filename": file.filename,
+        "size": len(contents),
+        "deduplicated": deduplicated,
+        "embedding_scheduled": embedding_scheduled,
+    }
+
+
+@router.head("/images/{image_id}")
+async def image_exists(image_id: str):
+    """Check whether an image with this SHA-256 is already uploaded"""
     try:
-        from .mask_generation_service import get_mask_generation_service
+        contents = uploaded_images.get(image_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    return Response(headers={"Content-Length": str(len(contents))})
 
-        # Get original image
-        original_image_bytes = uploaded_images[original_image_id]
 
-        # Load image
-        original_image = Image.open(io.BytesIO(original_image_bytes))
+@router.post("/run")
+async def run_inpainting(
+    request: Request,
+    original_image_id: str = Form(...),
+    mask_image_id: Optional[str] = Form(None),
+    points: str = Form("[]"),
+    labels: str = Form("[]"),
+    mask_format: Optional[MaskFormat] = Form(None),
+    multimask: bool = Form(True),
+    top_k: Optional[int] = Form(None),
+    min_score: Optional[float] = Form(None),
+):
+    """
+    Generate SAM masks synchronously
+
+    multimask=false asks SAM for a single mask; top_k and min_score drop
+    candidates before any upsampling, refinement or encoding.
+    """
+    _get_uploaded_image(original_image_id, "Original image")
 
-        # Get mask generation service and generate refined masks
+    if mask_image_id:
+        _get_uploaded_image(mask_image_id, "Mask image")
+
+    points_list, labels_list = _parse_prompts(points, labels)
+    _validate_top_k(top_k)
+    if mask_format is None:
+        mask_format = _default_mask_format(FEATHER_METHOD)
+
+    # Process synchronously
+    try:
+        from .mask_generation_service import get_mask_generation_service
+
+        # Get mask generation service and generate unrefined masks
         mask_gen_service = get_mask_generation_service()
 
-        # Run mask generation in thread pool to avoid blocking event loop
+        # Decode (or fetch the cached decoded array) and run mask generation
+        # in thread pool to avoid blocking event loop
         loop = asyncio.get_event_loop()
+        original_image = await loop.run_in_executor(
+            None, uploaded_images.get_array, original_image_id
+        )
         raw_results = await loop.run_in_executor(
             None,
-            mask_gen_service.generate_masks,
-            original_image,
-            points_list,
-            labels_list
+            partial(
+                mask_gen_service.generate_masks,
+                original_image,
+                points_list,
+                labels_list,
+                image_id=original_image_id,
+                multimask=multimask,
+                top_k=top_k,
+                min_score=min_score,
+            ),
         )
 
-        # Encode masks to base64 for API response
-        results = []
-        for result in raw_results:
-            mask = result["mask"]
-            score = result["score"]
+        # Keep the unrefined masks server-side; candidates are refined and
+        # encoded when first fetched
+        result = await loop.run_in_executor(
+            _postprocess_executor, _build_result,
+            original_image_id,
+            original_image.shape[:2],
+            raw_results,
+            mask_format,
+            RefinementParams(FEATHER_METHOD, FEATHER_WIDTH, FEATHER_SMOOTH_RADIUS),
+        )
+        result_id = results_store.put(result)
 
-            # Create masked image (cropped to bbox)
-            masked_image_b64 = _create_masked_image(original_image, mask)
+        return _result_response(request, result_id, result)
+
+    except ImageEvictedError:
+        raise HTTPException(status_code=410, detail="Original image has expired, please upload it again")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Mask generation failed: {str(e)}")
 
-            # Create grayscale mask (full size)
-            mask_image_b64 = _create_mask_image(mask, original_image.size)
 
-            results.append(
-                {
-                    "masked_image": masked_image_b64,
-                    "mask": mask_image_b64,
-                    "score": score,
-                }
-            )
+@router.post("/images/{image_id}/predict")
+async def predict_with_embedding(
+    request: Request,
+    image_id: str,
+    points: str = Form("[]"),
+    labels: str = Form("[]"),
+    mask_format: Optional[MaskFormat] = Form(None),
+    multimask: bool = Form(True),
+    top_k: Optional[int] = Form(None),
+    min_score: Optional[float] = Form(None),
+):
+    """
+    Generate SAM masks from an already computed image embedding.
+
+    Only the prompt encoder and mask decoder run; returns 425 while the
+    background embedding is still in flight and 409 if it was never computed.
+    Candidate selection works as in /run.
+    """
+    _get_uploaded_image(image_id)
+
+    points_list, labels_list = _parse_prompts(points, labels)
+    _validate_top_k(top_k)
+    if mask_format is None:
+        mask_format = _default_mask_format(FEATHER_METHOD)
+
+    from .embedding_worker import EmbeddingNotReadyError
+
+    try:
+        from .mask_generation_service import get_mask_generation_service
+
+        mask_gen_service = get_mask_generation_service()
 
-        return {"results": results}
+        # The embedding records the image size, so the image is never decoded
+        loop = asyncio.get_event_loop()
+        raw_results, image_size = await loop.run_in_executor(
+            _decoder_executor,
+            partial(
+                mask_gen_service.predict_masks,
+                image_id,
+                points_list,
+                labels_list,
+                multimask=multimask,
+                top_k=top_k,
+                min_score=min_score,
+            ),
+        )
 
+        result = await loop.run_in_executor(
+            _postprocess_executor, _build_result,
+            image_id,
+            image_size,
+            raw_results,
+            mask_format,
+            RefinementParams(FEATHER_METHOD, FEATHER_WIDTH, FEATHER_SMOOTH_RADIUS),
+        )
+        result_id = results_store.put(result)
+
+        return _result_response(request, result_id, result)
+
+    except EmbeddingNotReadyError as e:
+        raise HTTPException(status_code=425 if e.pending else 409, detail=str(e))
+    except ImageEvictedError:
+        raise HTTPException(status_code=410, detail="Image has expired, please upload it again")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Mask generation failed: {str(e)}")
 
 
+@router.post("/results/{result_id}/refine")
+async def refine_result(
+    request: Request,
+    result_id: str,
+    method: FeatheringMethod = Form(FEATHER_METHOD),
+    width: float = Form(FEATHER_WIDTH),
+    smooth_radius: int = Form(FEATHER_SMOOTH_RADIUS),
+    mask_format: Optional[MaskFormat] = Form(None),
+):
+    """
+    Re-refine the candidates of a result with other feathering parameters.
+
+    Starts from the result's unrefined SAM masks, so SAM does not run again.
+    Like any result, the new one is refined and encoded lazily on first
+    fetch, where smoothing and the distance transform are skipped while the
+    candidates' distance fields are cached.
+    """
+    if not 0 < width <= MAX_FEATHER_WIDTH:
+        raise HTTPException(status_code=400, detail=f"Width must be in (0, {MAX_FEATHER_WIDTH}]")
+    if not 0 <= smooth_radius <= MAX_SMOOTH_RADIUS:
+        raise HTTPException(status_code=400, detail=f"Smooth radius must be in [0, {MAX_SMOOTH_RADIUS}]")
+    if mask_format is None:
+        mask_format = _default_mask_format(method)
+
+    try:
+        result = results_store.get(result_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Result not found")
+
+    # Share the unrefined masks (and with them the distance-field cache key)
+    refined_result = StoredResult(
+        image_id=result.image_id,
+        candidates=[
+            CandidateResult(score=candidate.score, bbox=candidate.bbox)
+            for candidate in result.candidates
+        ],
+        width=result.width,
+        height=result.height,
+        mask_filename=_MASK_FILENAMES[mask_format],
+        mask_format=mask_format.value,
+        raw_id=result.raw_id,
+        raw=result.raw,
+        refinement=RefinementParams(method, width, smooth_radius),
+    )
+    refined_id = results_store.put(refined_result)
+
+    return _result_response(request, refined_id, refined_result)
+
+
+@router.get("/results/{result_id}/{candidate}/{filename}", name="get_result_file")
+async def get_result_file(
+    request: Request, result_id: str, candidate: int, filename: str
+):
+    """
+    Serve an encoded mask or cut-out of a stored result
+
+    The candidate is refined and encoded on first fetch and memoized.
+    """
+    try:
+        result = results_store.get(result_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Result not found")
+
+    if not 0 <= candidate < len(result.candidates):
+        raise HTTPException(status_code=404, detail="Candidate not found")
+
+    if filename not in ("cutout.png", result.mask_filename):
+        raise HTTPException(status_code=404, detail="File not found")
+
+    # Results are immutable under their ID, so the ID doubles as a strong ETag
+    etag = f'"{result_id}-{candidate}-{filename}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"private, max-age={int(RESULT_TTL_SECONDS)}, immutable",
+    }
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    data = result.candidates[candidate].files.get(filename)
+    if data is None:
+        try:
+            loop = asyncio.get_event_loop()
+            materialized = await loop.run_in_executor(
+                _postprocess_executor, _materialize_candidate, result_id, result, candidate
+            )
+        except (ImageEvictedError, KeyError):
+            raise HTTPException(status_code=410, detail="Original image has expired, please upload it again")
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Mask refinement failed: {str(e)}")
+        data = materialized.files[filename]
+
+    media_type = _MEDIA_TYPES[Path(filename).suffix]
+    return Response(content=data, media_type=media_type, headers=headers)
+
+
+@router.get("/metrics")
+async def get_metrics():
+    """Event-loop lag percentiles, cache counters and predictor pool usage"""
+    return {
+        "event_loop_lag": event_loop_lag_monitor.stats(),
+        "caches": cache_stats(),
+        "pools": pool_stats(),
+    }
+
+
 @router.get("/job/{job_id}")
 async def get_job_status(job_id: str):
     """Get the status of a job"""
@@ -1,19 +1,98 @@
 """SAM (Segment Anything Model) service for mask generation."""
 
+import hashlib
 import os
-from typing import Dict, List
+import threading
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple, Union
 
 import cv2
 import numpy as np
+import torch
 from PIL import Image
-from segment_anything import SamPredictor, sam_model_registry
+from segment_anything import SamPredictor
+
+from .cache import LRUCache
+from .consts import (
+    BACKEND,
+    DECODER_POOL_SIZE,
+    EMBEDDING_CACHE_MAX_BYTES,
+    INFERENCE_PROCESSES,
+    LOW_RES_MASKS,
+    MODEL_TYPE,
+    ONNX_DIR,
+    ONNX_THREADS,
+    PREDICTOR_POOL_SIZE,
+    QUANTIZE,
+)
+from .embedding_worker import EmbeddingNotReadyError, is_embedding_pending, wait_for_embedding
+from .mask_upsampling import upsample_mask_roi
+from .metrics import register_cache, register_pool
+from .model_registry import load_model
+from .predictor_pool import PredictorPool
+from .quantization import quantize_image_encoder
+
+
+@dataclass
+class ImageEmbedding:
+    """Image encoder output plus the geometry SamPredictor needs to decode prompts."""
+
+    features: torch.Tensor
+    original_size: Tuple[int, int]
+    input_size: Tuple[int, int]
+
+    @property
+    def nbytes(self) -> int:
+        return self.features.element_size() * self.features.nelement()
+
+
+def _to_rgb_array(image: Union[Image.Image, np.ndarray]) -> np.ndarray:
+    """
+    Convert an image to an RGB uint8 numpy array.
+
+    RGB arrays are returned as-is (not copied), so shared read-only arrays
+    from the decoded image cache pass straight through.
+    """
+    if isinstance(image, np.ndarray) and image.ndim == 3 and image.shape[2] == 3:
+        return image
+
+    # Convert PIL to numpy RGB
+    image_np = np.asarray(image)
+
+    # Ensure RGB format
+    if len(image_np.shape) == 2:  # Grayscale
+        image_np = cv2.cvtColor(image_np, cv2.COLOR_GRAY2RGB)
+    elif image_np.shape[2] == 4:  # RGBA
+        image_np = cv2.cvtColor(image_np, cv2.COLOR_RGBA2RGB)
+
+    return image_np
+
+
+def _image_key(image_np: np.ndarray) -> str:
+    """
+    Embedding cache key of an image without an ID.
+
+    Hashes the shape and dtype before the pixels: the same bytes laid out as
+    another shape are a different image.
+    """
+    digest = hashlib.sha256()
+    digest.update(repr((image_np.shape, image_np.dtype.str)).encode())
+    digest.update(np.ascontiguousarray(image_np))
+    return digest.hexdigest()
 
 
 class SAMService:
     """Singleton service for SAM model."""
 
     _instance = None
-    _predictor = None
+    _model = None
+    _encoder_pool = None
+    _decoder_pool = None
+    _worker_pool = None
+    _inflight = None
+    _inflight_lock = None
+    _embedding_cache = None
 
     def __new__(cls):
         if cls._instance is None:
@@ -22,102 +101,375 @@ class SAMService:
 
     def __init__(self):
         """Initialize SAM model if not already initialized."""
-        if self._predictor is None:
+        if self._model is None:
             self._initialize_model()
 
     def _initialize_model(self):
         """Load SAM model from checkpoint."""
         from pathlib import Path
 
-        # Get checkpoint path - default to backend/models/sam_vit_b_01ec64.pth
+        # Get checkpoint path - default to backend/models/sam_vit_h_4b8939.pth
         backend_dir = Path(__file__).parent.parent
         default_checkpoint = backend_dir / "models" / "sam_vit_h_4b8939.pth"
         sam_checkpoint = os.environ.get("SAM_CHECKPOINT_PATH", str(default_checkpoint))
-        model_type = "vit_h"
 
         # Use CPU device (MPS has issues with this library)
         device = "cpu"
 
-        print(f"Loading SAM model from {sam_checkpoint} on device: {device}")
+        print(f"Loading SAM model from {sam_checkpoint} on device: {device} ({BACKEND})")
+
+        if BACKEND == "onnx":
+            # Exported once, then served by ONNX Runtime; sessions release
+            # the GIL, so the encoder pool's threads run concurrently
+            from .onnx_backend import OnnxPredictor, OnnxSam, default_threads
+
+            onnx_dir = Path(ONNX_DIR) if ONNX_DIR else backend_dir / "models" / "onnx"
+            threads = ONNX_THREADS or default_threads(PREDICTOR_POOL_SIZE)
+            sam = OnnxSam.from_checkpoint(sam_checkpoint, MODEL_TYPE, onnx_dir, threads)
+            predictor_factory = OnnxPredictor
+        elif BACKEND == "torch":
+            # Load model, detecting its architecture unless SAM_MODEL_TYPE is set
+            sam = load_model(sam_checkpoint, MODEL_TYPE)
+            sam.to(device=device)
+            print(f"Loaded SAM model type {sam.model_type}")
+            # Quantized modules cannot be shared with worker processes; each
+            # worker quantizes its own encoder from the shared fp32 weights
+            if QUANTIZE and INFERENCE_PROCESSES == 0:
+                print(f"Quantizing SAM image encoder ({QUANTIZE})")
+                quantize_image_encoder(sam, QUANTIZE)
+            predictor_factory = SamPredictor
+        else:
+            raise ValueError(f"Unknown SAM backend: {BACKEND}")
+
+        self._model = sam
+        if INFERENCE_PROCESSES > 0 and BACKEND == "torch":
+            # Encoder passes run in worker processes mapping these same
+            # weights from shared memory; this process only decodes prompts
+            from .inference_workers import InferenceWorkerPool
 
-        # Load model
-        sam = sam_model_registry[model_type](checkpoint=sam_checkpoint)
-        sam.to(device=device)
+            self._worker_pool = InferenceWorkerPool(sam, INFERENCE_PROCESSES, quantize=QUANTIZE)
+            register_pool("sam_encoder_processes", self._worker_pool.stats)
+        else:
+            if BACKEND == "torch" and PREDICTOR_POOL_SIZE > 1:
+                # Split CPU threads between concurrent encoder passes instead
+                # of oversubscribing every core from each of them
+                torch.set_num_threads(max(1, (os.cpu_count() or 1) // PREDICTOR_POOL_SIZE))
+            self._encoder_pool = PredictorPool(sam, PREDICTOR_POOL_SIZE, predictor_factory)
+            register_pool("sam_encoder", self._encoder_pool.stats)
 
-        # Create predictor
-        self._predictor = SamPredictor(sam)
+        # Pools of predictors sharing the same weights. Each predictor holds
+        # per-image state and is used by one request at a time; keeping the
+        # decoders separate means prompt decoding never waits behind a
+        # multi-second encoder pass.
+        self._decoder_pool = PredictorPool(sam, DECODER_POOL_SIZE, predictor_factory)
+        register_pool("sam_decoder", self._decoder_pool.stats)
+        # Encoder passes in flight, so concurrent requests for one image share a pass
+        self._inflight: Dict[str, Future] = {}
+        self._inflight_lock = threading.Lock()
+        self._embedding_cache = LRUCache(EMBEDDING_CACHE_MAX_BYTES)
+        register_cache("embeddings", self._embedding_cache.stats)
 
         print("SAM model loaded successfully")
 
-    def generate_masks(
-        self, image: Image.Image, points: List[Dict[str, int]], labels: List[int]
-    ) -> List[Dict[str, any]]:
+    @staticmethod
+    def _snapshot_embedding(predictor: SamPredictor) -> ImageEmbedding:
+        """Capture an encoder predictor's current image state."""
+        return ImageEmbedding(
+            features=predictor.features,
+            original_size=predictor.original_size,
+            input_size=predictor.input_size,
+        )
+
+    @staticmethod
+    def _restore_embedding(predictor: SamPredictor, embedding: ImageEmbedding) -> None:
+        """Load a cached image state into a decoder predictor without running the encoder."""
+        predictor.reset_image()
+        predictor.features = embedding.features
+        predictor.original_size = embedding.original_size
+        predictor.input_size = embedding.input_size
+        predictor.is_image_set = True
+
+    def _encode(self, image_np: np.ndarray, image_id: str) -> ImageEmbedding:
+        """Run the image encoder on a pooled predictor or worker process and cache the result."""
+        if self._worker_pool is not None:
+            features, input_size = self._worker_pool.encode(image_np)
+            embedding = ImageEmbedding(
+                features=features, original_size=image_np.shape[:2], input_size=input_size
+            )
+        else:
+            with self._encoder_pool.predictor() as predictor:
+                # Set image for predictor (calculates embeddings)
+                predictor.set_image(image_np)
+                embedding = self._snapshot_embedding(predictor)
+        self._embedding_cache.put(image_id, embedding, embedding.nbytes)
+        return embedding
+
+    @staticmethod
+    def _predict_low_res(
+        predictor: SamPredictor, input_points: np.ndarray, input_labels: np.ndarray, multimask: bool
+    ) -> Tuple[torch.Tensor, np.ndarray]:
         """
-        Generate 3 candidate masks for given image and points.
+        Run the prompt encoder and mask decoder without upsampling the masks.
 
-        Args:
-            image: PIL Image (RGB)
-            points: List of dicts with 'x' and 'y' keys
-            labels: List of ints (1 for positive/foreground, 0 for negative/background)
+        Mirrors SamPredictor.predict_torch up to the mask decoder, so
+        candidates can be selected before any full-resolution work. The
+        caller has the predictor checked out with the embedding restored.
 
         Returns:
-            List of dicts containing:
-                - mask: numpy boolean array (H, W)
-                - score: float confidence score
+            (low-resolution logits (N, 256, 256), scores (N,)); N is 3 for
+            multimask output, otherwise 1
         """
-        # Convert PIL to numpy RGB
-        image_np = np.array(image)
+        model = predictor.model
+        coords = predictor.transform.apply_coords(input_points, predictor.original_size)
+        coords_torch = torch.as_tensor(coords, dtype=torch.float, device=predictor.device)[None]
+        labels_torch = torch.as_tensor(input_labels, dtype=torch.int, device=predictor.device)[None]
+
+        with torch.no_grad():
+            sparse_embeddings, dense_embeddings = model.prompt_encoder(
+                points=(coords_torch, labels_torch), boxes=None, masks=None
+            )
+            low_res_masks, iou_predictions = model.mask_decoder(
+                image_embeddings=predictor.features,
+                image_pe=model.prompt_encoder.get_dense_pe(),
+                sparse_prompt_embeddings=sparse_embeddings,
+                dense_prompt_embeddings=dense_embeddings,
+                multimask_output=multimask,
+            )
+
+        return low_res_masks[0], iou_predictions[0].cpu().numpy()
 
-        # Ensure RGB format
-        if len(image_np.shape) == 2:  # Grayscale
-            image_np = cv2.cvtColor(image_np, cv2.COLOR_GRAY2RGB)
-        elif image_np.shape[2] == 4:  # RGBA
-            image_np = cv2.cvtColor(image_np, cv2.COLOR_RGBA2RGB)
+    def _upsample(self, low_res_mask: torch.Tensor, embedding: ImageEmbedding) -> np.ndarray:
+        """Threshold one candidate's logits at full resolution into a boolean mask."""
+        model = self._model
+        if LOW_RES_MASKS:
+            # Upsample and threshold only the candidate's bbox
+            return upsample_mask_roi(
+                low_res_mask.cpu().numpy(),
+                embedding.input_size,
+                embedding.original_size,
+                threshold=model.mask_threshold,
+            )
+
+        # Same full-image upsampling as SamPredictor.predict
+        with torch.no_grad():
+            logits = model.postprocess_masks(
+                low_res_mask[None, None], embedding.input_size, embedding.original_size
+            )
+        return (logits[0, 0] > model.mask_threshold).cpu().numpy()
 
-        # Set image for predictor (calculates embeddings)
-        self._predictor.set_image(image_np)
+    def _decode(
+        self,
+        embedding: ImageEmbedding,
+        points: List[Dict[str, int]],
+        labels: List[int],
+        multimask: bool = True,
+        top_k: Optional[int] = None,
+        min_score: Optional[float] = None,
+    ) -> List[Dict[str, any]]:
+        """
+        Run the prompt encoder and mask decoder against a computed embedding.
 
+        Candidates are selected by score before upsampling, so dropped ones
+        never reach full resolution.
+        """
         # Prepare points for SAM
         input_points = np.array([[p["x"], p["y"]] for p in points])
         input_labels = np.array(labels, dtype=np.int32)  # Use provided labels (1=foreground, 0=background)
 
-        # Generate masks
-        masks, scores, logits = self._predictor.predict(
-            point_coords=input_points,
-            point_labels=input_labels,
-            multimask_output=True,  # Generate 3 candidate masks
-        )
+        with self._decoder_pool.predictor() as predictor:
+            self._restore_embedding(predictor, embedding)
+            if BACKEND == "onnx":
+                low_res_masks, scores = predictor.predict_low_res(
+                    input_points, input_labels, multimask
+                )
+            else:
+                low_res_masks, scores = self._predict_low_res(
+                    predictor, input_points, input_labels, multimask
+                )
 
-        # Sort by score (highest first)
+        # Sort by score (highest first), then apply the filters
         sorted_indices = np.argsort(scores)[::-1]
+        if min_score is not None:
+            sorted_indices = sorted_indices[scores[sorted_indices] >= min_score]
+        if top_k is not None:
+            sorted_indices = sorted_indices[:top_k]
 
         # Process each mask
         results = []
         for idx in sorted_indices:
-            mask = masks[idx]
-            score = float(scores[idx])
-
-            # Threshold mask to ensure strictly binary values (0.0 or 1.0)
-            # Threshold at midpoint (0.5) to handle any non-binary values
-            mask = (mask > 0.5).astype(np.float32)
-
             results.append(
                 {
-                    "mask": mask,  # Return binary numpy array (0.0 or 1.0)
-                    "score": score,
+                    "mask": self._upsample(low_res_masks[idx], embedding),  # Binary numpy array
+                    "score": float(scores[idx]),
                 }
             )
 
         return results
 
+    def _get_or_compute_embedding(self, image_np: np.ndarray, image_id: str) -> ImageEmbedding:
+        embedding = self._embedding_cache.get(image_id)
+        if embedding is not None:
+            return embedding
+
+        with self._inflight_lock:
+            future = self._inflight.get(image_id)
+            owner = future is None
+            if owner:
+                future = self._inflight[image_id] = Future()
+        if not owner:
+            # Another request is already encoding this image
+            return future.result()
+
+        try:
+            # A pass may have completed between the cache miss and registering ours
+            embedding = self._embedding_cache.get(image_id)
+            if embedding is None:
+                embedding = self._encode(image_np, image_id)
+            future.set_result(embedding)
+            return embedding
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                del self._inflight[image_id]
+
+    def has_embedding(self, image_id: str) -> bool:
+        """Return True if the embedding for this image is cached."""
+        return image_id in self._embedding_cache
+
+    def get_embedding(self, image_id: str) -> ImageEmbedding:
+        """
+        Return the cached embedding of an image.
+
+        Raises:
+            EmbeddingNotReadyError: If the embedding is not cached yet
+        """
+        embedding = self._embedding_cache.get(image_id)
+        if embedding is None:
+            raise EmbeddingNotReadyError(image_id, pending=self._is_encoding(image_id))
+        return embedding
+
+    def _is_encoding(self, image_id: str) -> bool:
+        """Whether an encoder pass for this image is queued or running, from upload or /run."""
+        if is_embedding_pending(image_id):
+            return True
+        with self._inflight_lock:
+            return image_id in self._inflight
+
+    def compute_embedding(
+        self, image: Union[Image.Image, np.ndarray], image_id: str
+    ) -> ImageEmbedding:
+        """
+        Compute and cache the embedding for an image unless it is already cached.
+
+        Args:
+            image: PIL Image or RGB uint8 array
+            image_id: Cache key for the image
+
+        Returns:
+            The cached ImageEmbedding
+        """
+        if image_id in self._embedding_cache:
+            return self._embedding_cache.get(image_id)
+        return self._get_or_compute_embedding(_to_rgb_array(image), image_id)
+
+    def generate_masks(
+        self,
+        image: Union[Image.Image, np.ndarray],
+        points: List[Dict[str, int]],
+        labels: List[int],
+        image_id: Optional[str] = None,
+        multimask: bool = True,
+        top_k: Optional[int] = None,
+        min_score: Optional[float] = None,
+    ) -> List[Dict[str, any]]:
+        """
+        Generate candidate masks for given image and points.
+
+        The image embedding is cached, so repeated calls for the same image only
+        run the prompt encoder and mask decoder.
+
+        Args:
+            image: PIL Image or RGB uint8 array (used read-only)
+            points: List of dicts with 'x' and 'y' keys
+            labels: List of ints (1 for positive/foreground, 0 for negative/background)
+            image_id: Cache key for the image; defaults to a hash of its pixels
+            multimask: Ask SAM for 3 candidates (True) or its single best mask
+            top_k: Keep at most this many candidates
+            min_score: Drop candidates scoring below this
+
+        Returns:
+            List of dicts, highest score first, containing:
+                - mask: numpy boolean array (H, W)
+                - score: float confidence score
+        """
+        image_np = _to_rgb_array(image)
+
+        if image_id is None:
+            image_id = _image_key(image_np)
+        else:
+            # Reuse a background encoder pass queued at upload time, if any
+            wait_for_embedding(image_id)
+
+        embedding = self._get_or_compute_embedding(image_np, image_id)
+        return self._decode(embedding, points, labels, multimask, top_k, min_score)
+
+    def predict_masks(
+        self,
+        image_id: str,
+        points: List[Dict[str, int]],
+        labels: List[int],
+        multimask: bool = True,
+        top_k: Optional[int] = None,
+        min_score: Optional[float] = None,
+    ) -> Tuple[List[Dict[str, any]], Tuple[int, int]]:
+        """
+        Generate candidate masks from an already computed embedding.
+
+        Never runs the image encoder.
+
+        Args:
+            image_id: Cache key of a previously embedded image
+            points: List of dicts with 'x' and 'y' keys
+            labels: List of ints (1 for positive/foreground, 0 for negative/background)
+            multimask, top_k, min_score: Candidate selection, as in generate_masks
+
+        Returns:
+            The candidates, as in generate_masks, and the (height, width) of
+            the image recorded with its embedding
+
+        Raises:
+            EmbeddingNotReadyError: If the embedding is not cached yet
+        """
+        embedding = self.get_embedding(image_id)
+        results = self._decode(embedding, points, labels, multimask, top_k, min_score)
+        return results, tuple(embedding.original_size)
+
+    def shutdown(self) -> None:
+        """Stop encoder worker processes, if any."""
+        if self._worker_pool is not None:
+            self._worker_pool.shutdown()
+
 
 # Global singleton instance
 _sam_service = None
+# Serializes the first creation: concurrent first requests would otherwise
+# each load the checkpoint
+_sam_service_lock = threading.Lock()
 
 
 def get_sam_service() -> SAMService:
     """Get or create the global SAM service instance."""
     global _sam_service
     if _sam_service is None:
-        _sam_service = SAMService()
+        with _sam_service_lock:
+            if _sam_service is None:
+                _sam_service = SAMService()
     return _sam_service
+
+
+def shutdown_sam_service() -> None:
+    """Release the SAM service's worker processes if it was ever created."""
+    if _sam_service is not None:
+        _sam_service.shutdown()
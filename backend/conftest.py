@@ -13,3 +13,47 @@ from api.main import app
 def client():
     """Test client fixture for FastAPI app"""
     return TestClient(app)
+
+
+@pytest.fixture
+def tiny_sam():
+    """
+    Randomly initialized SAM with SAM's input and embedding sizes but a
+    one-block, narrow ViT encoder, so it builds and runs in well under a second
+    """
+    import torch
+    from segment_anything.modeling import (
+        ImageEncoderViT,
+        MaskDecoder,
+        PromptEncoder,
+        Sam,
+        TwoWayTransformer,
+    )
+
+    torch.manual_seed(0)
+    sam = Sam(
+        image_encoder=ImageEncoderViT(
+            img_size=1024,
+            patch_size=16,
+            embed_dim=32,
+            depth=1,
+            num_heads=1,
+            out_chans=256,
+            window_size=0,
+            global_attn_indexes=(),
+        ),
+        prompt_encoder=PromptEncoder(
+            embed_dim=256,
+            image_embedding_size=(64, 64),
+            input_image_size=(1024, 1024),
+            mask_in_chans=16,
+        ),
+        mask_decoder=MaskDecoder(
+            num_multimask_outputs=3,
+            transformer=TwoWayTransformer(depth=1, embedding_dim=256, mlp_dim=64, num_heads=2),
+            transformer_dim=256,
+            iou_head_depth=1,
+            iou_head_hidden_dim=32,
+        ),
+    )
+    return sam.eval()
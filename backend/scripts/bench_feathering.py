@@ -0,0 +1,131 @@
+"""
+Micro-benchmark: direct profile evaluation vs lookup-table feathering.
+
+Reports end-to-end feathering time (dominated by the distance transform,
+which both paths share) and the time of the profile stage alone, given a
+precomputed distance field. A second table compares the full float
+refinement (apply_feathering) with the fused uint8 kernel
+(apply_feathering_u8), including peak numpy allocations per call.
+
+Usage (from the backend directory):
+    uv run python scripts/bench_feathering.py [--size 2000] [--width 10] [--repeats 5]
+"""
+
+import argparse
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from api.mask_refinement_service import (  # noqa: E402
+    FEATHER_PROFILES,
+    FeatheringMethod,
+    _feather,
+    apply_feathering,
+    apply_feathering_u8,
+    feather_lut,
+    profile_lut,
+    smooth_open_close,
+)
+from scipy.ndimage import distance_transform_edt  # noqa: E402
+
+
+def _best_time(fn, repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _peak_bytes(fn) -> int:
+    """Peak traced allocation of one call (numpy reports its buffers to tracemalloc)."""
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def _direct_stage(M: np.ndarray, D: np.ndarray, g, w: float) -> np.ndarray:
+    """Profile stage of _feather: per-pixel g(t) plus boolean index masks."""
+    t = np.clip(D / w, 0.0, 1.0)
+    band = D < w
+    ramp_vals = g(t)
+    alpha = np.zeros_like(t, dtype=np.float32)
+    alpha[M] = 1.0
+    alpha[~M & band] = ramp_vals[~M & band]
+    return alpha
+
+
+def _lut_stage(D: np.ndarray, lut: np.ndarray) -> np.ndarray:
+    """Profile stage of feather_lut: one gather by squared distance."""
+    d2 = D * D
+    np.minimum(d2, len(lut) - 1, out=d2)
+    return lut[np.rint(d2, out=d2).astype(np.intp)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=2000, help="Square mask side in pixels")
+    parser.add_argument("--width", type=float, default=10.0, help="Feather width in pixels")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    # A large blob covering a quarter of the frame, so the whole image is processed
+    yy, xx = np.mgrid[: args.size, : args.size]
+    center, radius = args.size / 2, args.size / 4
+    mask = smooth_open_close((yy - center) ** 2 + (xx - center) ** 2 < radius**2, r=4)
+
+    distance = distance_transform_edt(~mask)
+
+    print(f"mask {args.size}x{args.size}, width {args.width}, best of {args.repeats}")
+    print(
+        f"{'method':<16}{'direct ms':>12}{'lut ms':>10}{'speed-up':>10}"
+        f"{'stage direct':>14}{'stage lut':>11}{'speed-up':>10}{'max err':>10}"
+    )
+    for method in FeatheringMethod:
+        if method == FeatheringMethod.NONE:
+            direct = _best_time(lambda: mask.astype(np.float32), args.repeats)
+            print(f"{method.value:<16}{direct * 1000:>12.1f}" + f"{'-':>10}" * 2 + f"{'-':>14}{'-':>11}" + f"{'-':>10}" * 2)
+            continue
+
+        g = FEATHER_PROFILES[method]
+        reference = _feather(mask, g, args.width)
+        error = np.abs(feather_lut(mask, method, args.width) - reference).max()
+
+        direct = _best_time(lambda: _feather(mask, g, args.width), args.repeats)
+        lut = _best_time(lambda: feather_lut(mask, method, args.width), args.repeats)
+        table = profile_lut(method, args.width)
+        stage_direct = _best_time(lambda: _direct_stage(mask, distance, g, args.width), args.repeats)
+        stage_lut = _best_time(lambda: _lut_stage(distance, table), args.repeats)
+        print(
+            f"{method.value:<16}{direct * 1000:>12.1f}{lut * 1000:>10.1f}{direct / lut:>9.2f}x"
+            f"{stage_direct * 1000:>14.1f}{stage_lut * 1000:>11.1f}{stage_direct / stage_lut:>9.2f}x"
+            f"{error:>10.1e}"
+        )
+
+    print()
+    print(f"{'method':<16}{'float ms':>10}{'u8 ms':>10}{'speed-up':>10}{'float MiB':>11}{'u8 MiB':>9}")
+    out = np.empty(mask.shape, dtype=np.uint8)
+    for method in FeatheringMethod:
+        # Warm the per-thread scratch buffers and lookup tables first
+        apply_feathering_u8(mask, method, args.width, out=out)
+        fused = _best_time(lambda: apply_feathering_u8(mask, method, args.width, out=out), args.repeats)
+        full = _best_time(lambda: apply_feathering(mask, method, args.width), args.repeats)
+        fused_peak = _peak_bytes(lambda: apply_feathering_u8(mask, method, args.width, out=out))
+        full_peak = _peak_bytes(lambda: apply_feathering(mask, method, args.width))
+        print(
+            f"{method.value:<16}{full * 1000:>10.1f}{fused * 1000:>10.1f}{full / fused:>9.2f}x"
+            f"{full_peak / 2**20:>11.1f}{fused_peak / 2**20:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
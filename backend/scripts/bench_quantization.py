@@ -0,0 +1,129 @@
+"""
+Benchmark: fp32 vs dynamically quantized (int8) SAM image encoder.
+
+For every image in a directory, runs the image encoder with both models and
+decodes the same point prompts (a fixed grid of single positive points).
+Reports encoder time, the IoU of each int8 mask against the matching fp32
+candidate, and the serialized size of the encoder weights.
+
+Usage (from the backend directory):
+    uv run python scripts/bench_quantization.py IMAGE_DIR [--checkpoint PATH] [--repeats 3]
+"""
+
+import argparse
+import copy
+import io
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import torch
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from api.model_registry import load_model  # noqa: E402
+from api.quantization import quantize_image_encoder  # noqa: E402
+from segment_anything import SamPredictor  # noqa: E402
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".webp"}
+
+# Prompt points as fractions of the image size
+PROMPT_GRID = [(0.5, 0.5), (0.3, 0.3), (0.7, 0.3), (0.3, 0.7), (0.7, 0.7)]
+
+
+def _best_time(fn, repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _serialized_mib(module: torch.nn.Module) -> float:
+    buffer = io.BytesIO()
+    torch.save(module.state_dict(), buffer)
+    return buffer.tell() / (1024 * 1024)
+
+
+def _iou(a: np.ndarray, b: np.ndarray) -> float:
+    union = np.logical_or(a, b).sum()
+    if union == 0:
+        return 1.0
+    return float(np.logical_and(a, b).sum() / union)
+
+
+def _masks(predictor: SamPredictor, image: np.ndarray):
+    """Candidate masks for every grid prompt (encoder state must be set)."""
+    height, width = image.shape[:2]
+    results = []
+    for fx, fy in PROMPT_GRID:
+        masks, _, _ = predictor.predict(
+            point_coords=np.array([[fx * width, fy * height]]),
+            point_labels=np.array([1]),
+            multimask_output=True,
+        )
+        results.append(masks)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("images", type=Path, help="Directory of benchmark images")
+    parser.add_argument(
+        "--checkpoint",
+        default=os.environ.get(
+            "SAM_CHECKPOINT_PATH", str(Path(__file__).parent.parent / "models" / "sam_vit_h_4b8939.pth")
+        ),
+    )
+    parser.add_argument("--model-type", default="auto", help="Registered model type, or auto-detect")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    paths = sorted(p for p in args.images.iterdir() if p.suffix.lower() in IMAGE_SUFFIXES)
+    if not paths:
+        parser.error(f"no images in {args.images}")
+
+    fp32 = load_model(args.checkpoint, args.model_type)
+    int8 = quantize_image_encoder(copy.deepcopy(fp32), "int8")
+    predictors = {"fp32": SamPredictor(fp32), "int8": SamPredictor(int8)}
+
+    print(f"{fp32.model_type}, {len(paths)} images, {len(PROMPT_GRID)} prompts each, best of {args.repeats}")
+    print(f"encoder weights: fp32 {_serialized_mib(fp32.image_encoder):.0f} MiB, "
+          f"int8 {_serialized_mib(int8.image_encoder):.0f} MiB")
+    print(f"{'image':<32}{'fp32 s':>9}{'int8 s':>9}{'speed-up':>10}{'mean IoU':>10}{'min IoU':>9}")
+
+    totals = {"fp32": 0.0, "int8": 0.0}
+    all_ious = []
+    for path in paths:
+        image = np.asarray(Image.open(path).convert("RGB"))
+        times = {}
+        masks = {}
+        with torch.no_grad():
+            for name, predictor in predictors.items():
+                times[name] = _best_time(lambda: predictor.set_image(image), args.repeats)
+                masks[name] = _masks(predictor, image)
+        ious = [
+            _iou(ref, quant)
+            for ref_set, quant_set in zip(masks["fp32"], masks["int8"])
+            for ref, quant in zip(ref_set, quant_set)
+        ]
+        all_ious.extend(ious)
+        for name in totals:
+            totals[name] += times[name]
+        print(
+            f"{path.name[:31]:<32}{times['fp32']:>9.2f}{times['int8']:>9.2f}"
+            f"{times['fp32'] / times['int8']:>9.2f}x{np.mean(ious):>10.4f}{np.min(ious):>9.4f}"
+        )
+
+    print(
+        f"{'total':<32}{totals['fp32']:>9.2f}{totals['int8']:>9.2f}"
+        f"{totals['fp32'] / totals['int8']:>9.2f}x{np.mean(all_ious):>10.4f}{np.min(all_ious):>9.4f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,8 @@
+import hashlib
 import io
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
 from PIL import Image
 
 
@@ -93,8 +97,19 @@ def test_run_with_multiple_points(client):
         assert "masked_image" in result
         assert "mask" in result
         assert "score" in result
-        assert result["masked_image"].startswith("data:image/png;base64,")
-        assert result["mask"].startswith("data:image/png;base64,")
+        assert result["masked_image"].endswith("/cutout.png")
+        assert result["mask"].endswith("/mask.png")
+
+    # Masks are served as binary PNG resources
+    mask_response = client.get(data["results"][0]["mask"])
+    assert mask_response.status_code == 200
+    assert mask_response.headers["content-type"] == "image/png"
+    assert mask_response.content.startswith(b"\x89PNG")
+
+    # Revalidation with the ETag is answered without a body
+    etag = mask_response.headers["etag"]
+    cached_response = client.get(data["results"][0]["mask"], headers={"If-None-Match": etag})
+    assert cached_response.status_code == 304
 
 
 def test_sam_mask_generation(client):
@@ -131,3 +146,419 @@ def test_sam_mask_generation(client):
     assert "results" in data
     assert isinstance(data["results"], list)
     assert len(data["results"]) == 3  # Should return 3 candidate masks
+
+
+def test_predict_unknown_image(client):
+    """Test decoder-only prediction for an image that was never uploaded"""
+    response = client.post(
+        "/api/images/does-not-exist/predict",
+        data={"points": '[{"x": 50, "y": 50}]', "labels": '[1]'},
+    )
+
+    assert response.status_code == 404
+
+
+def _upload_without_embedding(client, monkeypatch, color):
+    """Upload an image, then empty the embedding cache so its embedding is missing"""
+    from api import embedding_worker, sam_service
+    from api.cache import LRUCache
+
+    img = Image.new("RGB", (100, 100), color=color)
+    img_bytes = io.BytesIO()
+    img.save(img_bytes, format="PNG")
+    img_bytes.seek(0)
+
+    image_id = client.post(
+        "/api/upload/image",
+        files={"file": ("test.png", img_bytes, "image/png")},
+        data={"image_type": "original"},
+    ).json()["image_id"]
+
+    # Let the upload's background pass finish so it cannot fill the new cache
+    embedding_worker.wait_for_embedding(image_id)
+    service = sam_service.get_sam_service()
+    monkeypatch.setattr(service, "_embedding_cache", LRUCache(1024 * 1024))
+    return image_id, service
+
+
+def test_predict_while_embedding_pending(client, monkeypatch):
+    """Test that decoder-only prediction returns 425 while the upload's embedding is in flight"""
+    from api import sam_service
+
+    image_id, _ = _upload_without_embedding(client, monkeypatch, "orange")
+    monkeypatch.setattr(sam_service, "is_embedding_pending", lambda image_id: True)
+
+    response = client.post(
+        f"/api/images/{image_id}/predict",
+        data={"points": '[{"x": 50, "y": 50}]', "labels": '[1]'},
+    )
+
+    assert response.status_code == 425
+
+
+def test_predict_while_run_is_encoding(client, monkeypatch):
+    """Test that an encoder pass started by /run also makes prediction return 425"""
+    from api import sam_service
+
+    image_id, service = _upload_without_embedding(client, monkeypatch, "navy")
+    monkeypatch.setattr(sam_service, "is_embedding_pending", lambda image_id: False)
+    monkeypatch.setitem(service._inflight, image_id, Future())
+
+    response = client.post(
+        f"/api/images/{image_id}/predict",
+        data={"points": '[{"x": 50, "y": 50}]', "labels": '[1]'},
+    )
+
+    assert response.status_code == 425
+
+
+def test_predict_without_embedding(client, monkeypatch):
+    """Test that decoder-only prediction returns 409 when the embedding was never computed"""
+    from api import sam_service
+
+    image_id, _ = _upload_without_embedding(client, monkeypatch, "pink")
+    monkeypatch.setattr(sam_service, "is_embedding_pending", lambda image_id: False)
+
+    response = client.post(
+        f"/api/images/{image_id}/predict",
+        data={"points": '[{"x": 50, "y": 50}]', "labels": '[1]'},
+    )
+
+    assert response.status_code == 409
+
+
+def test_upload_larger_than_store(client, monkeypatch):
+    """Test that an upload the store cannot hold is rejected instead of silently dropped"""
+    from api import routes
+    from api.image_store import ImageStore
+
+    monkeypatch.setattr(routes, "uploaded_images", ImageStore(100))
+    img = Image.new("RGB", (100, 100), color="gray")
+    img_bytes = io.BytesIO()
+    img.save(img_bytes, format="BMP")
+    contents = img_bytes.getvalue()
+
+    response = client.post(
+        "/api/upload/image",
+        files={"file": ("test.bmp", io.BytesIO(contents), "image/bmp")},
+        data={"image_type": "original"},
+    )
+
+    assert response.status_code == 413
+    assert client.head(f"/api/images/{hashlib.sha256(contents).hexdigest()}").status_code == 404
+
+
+def test_upload_is_content_addressed(client):
+    """Test that identical uploads share one SHA-256 image ID"""
+    img = Image.new("RGB", (100, 100), color="yellow")
+    img_bytes = io.BytesIO()
+    img.save(img_bytes, format="PNG")
+    contents = img_bytes.getvalue()
+
+    first = client.post(
+        "/api/upload/image",
+        files={"file": ("test.png", io.BytesIO(contents), "image/png")},
+        data={"image_type": "mask"},
+    ).json()
+    second = client.post(
+        "/api/upload/image",
+        files={"file": ("again.png", io.BytesIO(contents), "image/png")},
+        data={"image_type": "mask"},
+    ).json()
+
+    assert first["image_id"] == hashlib.sha256(contents).hexdigest()
+    assert second["image_id"] == first["image_id"]
+    assert second["deduplicated"] is True
+
+    assert client.head(f"/api/images/{first['image_id']}").status_code == 200
+    assert client.head(f"/api/images/{'0' * 64}").status_code == 404
+
+
+def test_reupload_extends_ttl(client, monkeypatch):
+    """Test that uploading an image again restarts its time to live"""
+    from api import routes
+    from api.image_store import ImageStore
+
+    monkeypatch.setattr(routes, "uploaded_images", ImageStore(1024 * 1024, ttl=0.5))
+    img = Image.new("RGB", (100, 100), color="white")
+    img_bytes = io.BytesIO()
+    img.save(img_bytes, format="PNG")
+    contents = img_bytes.getvalue()
+
+    def upload():
+        return client.post(
+            "/api/upload/image",
+            files={"file": ("test.png", io.BytesIO(contents), "image/png")},
+            data={"image_type": "mask"},
+        ).json()
+
+    image_id = upload()["image_id"]
+    time.sleep(0.3)
+    assert upload()["deduplicated"] is True
+    time.sleep(0.3)
+
+    assert client.head(f"/api/images/{image_id}").status_code == 200
+
+
+def test_metrics(client):
+    """Test that metrics report event-loop lag and cache counters"""
+    response = client.get("/api/metrics")
+
+    assert response.status_code == 200
+    data = response.json()
+    assert "p99_ms" in data["event_loop_lag"]
+    assert "uploads" in data["caches"]
+
+
+def test_result_not_found(client):
+    """Test fetching a result that does not exist"""
+    response = client.get("/api/results/does-not-exist/0/mask.png")
+
+    assert response.status_code == 404
+
+
+def test_run_with_raw_mask_format(client):
+    """Test requesting the mask as raw uint8 bytes"""
+    img = Image.new("RGB", (100, 80), color="purple")
+    img_bytes = io.BytesIO()
+    img.save(img_bytes, format="PNG")
+    img_bytes.seek(0)
+
+    upload_response = client.post(
+        "/api/upload/image",
+        files={"file": ("test.png", img_bytes, "image/png")},
+        data={"image_type": "original"},
+    )
+    image_id = upload_response.json()["image_id"]
+
+    response = client.post(
+        "/api/run",
+        data={
+            "original_image_id": image_id,
+            "points": '[{"x": 50, "y": 40}]',
+            "labels": '[1]',
+            "mask_format": "raw",
+        },
+    )
+
+    assert response.status_code == 200
+    data = response.json()
+    mask_url = data["results"][0]["mask"]
+    assert mask_url.endswith("/mask.raw")
+
+    mask_response = client.get(mask_url)
+    assert mask_response.headers["content-type"] == "application/octet-stream"
+    assert len(mask_response.content) == data["width"] * data["height"]
+
+
+def test_refine_result(client):
+    """Test re-refining a result with other feathering parameters"""
+    img = Image.new("RGB", (100, 80), color="teal")
+    img_bytes = io.BytesIO()
+    img.save(img_bytes, format="PNG")
+    img_bytes.seek(0)
+
+    upload_response = client.post(
+        "/api/upload/image",
+        files={"file": ("test.png", img_bytes, "image/png")},
+        data={"image_type": "original"},
+    )
+    image_id = upload_response.json()["image_id"]
+
+    run_response = client.post(
+        "/api/run",
+        data={"original_image_id": image_id, "points": '[{"x": 50, "y": 40}]', "labels": '[1]'},
+    )
+    assert run_response.status_code == 200
+    run_data = run_response.json()
+
+    response = client.post(
+        f"/api/results/{run_data['result_id']}/refine",
+        data={"method": "linear", "width": 3, "smooth_radius": 0},
+    )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["result_id"] != run_data["result_id"]
+    assert [r["score"] for r in data["results"]] == [r["score"] for r in run_data["results"]]
+    assert client.get(data["results"][0]["mask"]).status_code == 200
+
+    # The refined result can itself be refined again
+    response = client.post(f"/api/results/{data['result_id']}/refine", data={"method": "none"})
+    assert response.status_code == 200
+
+
+def test_refine_unknown_result(client):
+    """Test refining a result that does not exist"""
+    response = client.post("/api/results/does-not-exist/refine", data={"method": "linear"})
+
+    assert response.status_code == 404
+
+
+def test_refine_invalid_width(client):
+    """Test that out-of-range refinement parameters are rejected"""
+    response = client.post("/api/results/does-not-exist/refine", data={"width": 0})
+
+    assert response.status_code == 400
+
+
+def test_run_with_top_k(client):
+    """Test that top_k keeps only the best candidates"""
+    img = Image.new("RGB", (100, 80), color="olive")
+    img_bytes = io.BytesIO()
+    img.save(img_bytes, format="PNG")
+    img_bytes.seek(0)
+
+    upload_response = client.post(
+        "/api/upload/image",
+        files={"file": ("test.png", img_bytes, "image/png")},
+        data={"image_type": "original"},
+    )
+    image_id = upload_response.json()["image_id"]
+    prompt = {"original_image_id": image_id, "points": '[{"x": 50, "y": 40}]', "labels": '[1]'}
+
+    all_response = client.post("/api/run", data=prompt)
+    top_response = client.post("/api/run", data={**prompt, "top_k": 1})
+
+    assert top_response.status_code == 200
+    best = max(r["score"] for r in all_response.json()["results"])
+    assert [r["score"] for r in top_response.json()["results"]] == [best]
+
+    # Nothing scores above 1, so every candidate is dropped
+    response = client.post("/api/run", data={**prompt, "min_score": 1.5})
+    assert response.status_code == 200
+    assert response.json()["results"] == []
+
+
+def test_run_with_invalid_top_k(client):
+    """Test that a non-positive top_k is rejected"""
+    img = Image.new("RGB", (100, 80), color="navy")
+    img_bytes = io.BytesIO()
+    img.save(img_bytes, format="PNG")
+    img_bytes.seek(0)
+
+    upload_response = client.post(
+        "/api/upload/image",
+        files={"file": ("test.png", img_bytes, "image/png")},
+        data={"image_type": "original"},
+    )
+    image_id = upload_response.json()["image_id"]
+
+    response = client.post(
+        "/api/run",
+        data={"original_image_id": image_id, "points": '[{"x": 50, "y": 40}]', "labels": '[1]', "top_k": 0},
+    )
+
+    assert response.status_code == 400
+
+
+def test_result_candidates_materialize_on_fetch(client):
+    """Test that candidates are refined and encoded on first fetch, then memoized"""
+    img = Image.new("RGB", (100, 80), color="maroon")
+    img_bytes = io.BytesIO()
+    img.save(img_bytes, format="PNG")
+    img_bytes.seek(0)
+
+    upload_response = client.post(
+        "/api/upload/image",
+        files={"file": ("test.png", img_bytes, "image/png")},
+        data={"image_type": "original"},
+    )
+    image_id = upload_response.json()["image_id"]
+
+    response = client.post(
+        "/api/run",
+        data={"original_image_id": image_id, "points": '[{"x": 50, "y": 40}]', "labels": '[1]'},
+    )
+    assert response.status_code == 200
+    result = response.json()["results"][0]
+    x_min, y_min, x_max, y_max = result["bbox"]
+    assert 0 <= x_min < x_max <= 100 and 0 <= y_min < y_max <= 80
+
+    results_bytes = client.get("/api/metrics").json()["caches"]["results"]["bytes"]
+    first = client.get(result["masked_image"])
+    assert first.status_code == 200
+    assert client.get("/api/metrics").json()["caches"]["results"]["bytes"] > results_bytes
+
+    second = client.get(result["masked_image"])
+    assert second.content == first.content
+
+
+def test_predict_with_computed_embedding(client):
+    """Test that decoder-only prediction reports the image size from the embedding"""
+    img = Image.new("RGB", (100, 80), color="olive")
+    img_bytes = io.BytesIO()
+    img.save(img_bytes, format="PNG")
+    img_bytes.seek(0)
+
+    upload_response = client.post(
+        "/api/upload/image",
+        files={"file": ("test.png", img_bytes, "image/png")},
+        data={"image_type": "original"},
+    )
+    image_id = upload_response.json()["image_id"]
+    client.post(
+        "/api/run",
+        data={"original_image_id": image_id, "points": '[{"x": 50, "y": 40}]', "labels": '[1]'},
+    )
+
+    response = client.post(
+        f"/api/images/{image_id}/predict",
+        data={"points": '[{"x": 20, "y": 20}]', "labels": '[1]'},
+    )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert (data["width"], data["height"]) == (100, 80)
+    assert len(data["results"]) == 3
+
+
+def test_concurrent_materialization_matches_sequential(client):
+    """Test that materializing candidates from several threads is safe and matches sequential refinement"""
+    from api import routes
+    from api.mask_refinement_service import apply_feathering_u8
+
+    img = Image.new("RGB", (160, 120), color="teal")
+    img_bytes = io.BytesIO()
+    img.save(img_bytes, format="PNG")
+    img_bytes.seek(0)
+
+    upload_response = client.post(
+        "/api/upload/image",
+        files={"file": ("test.png", img_bytes, "image/png")},
+        data={"image_type": "original"},
+    )
+    image_id = upload_response.json()["image_id"]
+
+    response = client.post(
+        "/api/run",
+        data={
+            "original_image_id": image_id,
+            "points": '[{"x": 80, "y": 60}]',
+            "labels": '[1]',
+            "mask_format": "raw",
+        },
+    )
+    assert response.status_code == 200
+    data = response.json()
+    scores = [candidate["score"] for candidate in data["results"]]
+    assert len(scores) == 3
+    assert scores == sorted(scores, reverse=True)
+
+    result = routes.results_store.get(data["result_id"])
+    indices = range(len(result.candidates))
+    with ThreadPoolExecutor(max_workers=len(indices)) as pool:
+        materialized = list(
+            pool.map(
+                lambda i: routes._materialize_candidate(data["result_id"], result, i), indices
+            )
+        )
+
+    params = result.refinement
+    for i, candidate in enumerate(materialized):
+        assert candidate.score == scores[i]
+        expected = apply_feathering_u8(
+            result.raw.mask(i), params.method, params.width, smooth_radius=params.smooth_radius
+        )
+        assert candidate.files["mask.raw"] == expected.tobytes()
+        assert client.get(data["results"][i]["mask"]).content == expected.tobytes()
@@ -0,0 +1,66 @@
+import time
+
+from api.cache import LRUCache
+
+
+def test_cache_hit_and_miss():
+    """Test basic get/put and counters"""
+    cache = LRUCache(max_bytes=100)
+    cache.put("a", "value-a", 10)
+
+    assert cache.get("a") == "value-a"
+    assert cache.get("b") is None
+    assert cache.hits == 1
+    assert cache.misses == 1
+
+
+def test_cache_evicts_least_recently_used():
+    """Test that the byte budget evicts the oldest unused entry"""
+    cache = LRUCache(max_bytes=30)
+    cache.put("a", 1, 10)
+    cache.put("b", 2, 10)
+    cache.put("c", 3, 10)
+
+    # Touch "a" so "b" becomes the eviction candidate
+    cache.get("a")
+    cache.put("d", 4, 10)
+
+    assert "a" in cache
+    assert "b" not in cache
+    assert cache.total_bytes == 30
+    assert cache.evictions == 1
+
+
+def test_cache_skips_oversized_values():
+    """Test that values larger than the budget are not stored"""
+    cache = LRUCache(max_bytes=10)
+    cache.put("big", b"x" * 20, 20)
+
+    assert "big" not in cache
+    assert cache.total_bytes == 0
+
+
+def test_cache_resize_keeps_expiry_and_never_inserts():
+    """Test that resizing re-accounts a present entry without reviving or refreshing it"""
+    cache = LRUCache(max_bytes=100, ttl=0.2)
+    cache.put("a", [1], 10)
+
+    assert cache.resize("a", 30)
+    assert cache.total_bytes == 30
+    assert not cache.resize("missing", 10)
+    assert "missing" not in cache
+
+    time.sleep(0.25)
+    assert not cache.resize("a", 40)
+    assert "a" not in cache
+
+
+def test_cache_resize_evicts_over_budget():
+    """Test that growing an entry past the budget evicts the oldest entries"""
+    cache = LRUCache(max_bytes=30)
+    cache.put("a", 1, 10)
+    cache.put("b", 2, 10)
+
+    assert cache.resize("b", 25)
+    assert "a" not in cache
+    assert cache.total_bytes == 25
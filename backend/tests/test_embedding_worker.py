@@ -0,0 +1,73 @@
+import threading
+from concurrent.futures import Future
+
+from api import embedding_worker, sam_service
+
+
+class _InlineExecutor:
+    """Runs jobs on submit, so the returned future is already done"""
+
+    def submit(self, fn, *args):
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+class _SamService:
+    def __init__(self, cached):
+        self.cached = cached
+        self.computed = []
+
+    def has_embedding(self, image_id):
+        return self.cached
+
+    def compute_embedding(self, image, image_id):
+        self.computed.append(image_id)
+
+
+def _schedule_in_thread(image_id, load_image):
+    """Schedule from another thread and return whether it finished"""
+    thread = threading.Thread(
+        target=embedding_worker.schedule_embedding, args=(image_id, load_image), daemon=True
+    )
+    thread.start()
+    thread.join(timeout=5)
+    return not thread.is_alive()
+
+
+def test_schedule_does_not_deadlock_on_completed_future(monkeypatch):
+    """Test that a job finishing before its callback is registered does not hang"""
+    service = _SamService(cached=False)
+    monkeypatch.setattr(embedding_worker, "_encoder_executor", _InlineExecutor())
+    monkeypatch.setattr(sam_service, "get_sam_service", lambda: service)
+
+    assert _schedule_in_thread("img", lambda: object())
+    assert service.computed == ["img"]
+    assert not embedding_worker.is_embedding_pending("img")
+
+
+def test_failed_job_is_forgotten_without_deadlock(monkeypatch):
+    """Test that a job failing fast is removed from the pending set"""
+    monkeypatch.setattr(embedding_worker, "_encoder_executor", _InlineExecutor())
+    monkeypatch.setattr(sam_service, "get_sam_service", lambda: _SamService(cached=False))
+
+    def load_image():
+        raise OSError("decode failed")
+
+    assert _schedule_in_thread("broken", load_image)
+    assert not embedding_worker.is_embedding_pending("broken")
+
+
+def test_cached_embedding_skips_decoding(monkeypatch):
+    """Test that an already embedded image is never loaded again"""
+    service = _SamService(cached=True)
+    loads = []
+    monkeypatch.setattr(embedding_worker, "_encoder_executor", _InlineExecutor())
+    monkeypatch.setattr(sam_service, "get_sam_service", lambda: service)
+
+    assert _schedule_in_thread("img", lambda: loads.append(1))
+    assert loads == []
+    assert service.computed == []
@@ -0,0 +1,39 @@
+import time
+
+import pytest
+
+from api.image_store import ImageEvictedError, ImageStore
+
+
+def test_store_evicts_over_budget():
+    """Test that the oldest image is evicted once the byte budget is exceeded"""
+    store = ImageStore(max_bytes=20)
+    store.put("a", b"x" * 10)
+    store.put("b", b"y" * 10)
+    store.put("c", b"z" * 10)
+
+    assert store.get("c") == b"z" * 10
+    with pytest.raises(ImageEvictedError):
+        store.get("a")
+    assert store.stats()["encoded"]["evictions"] == 1
+
+
+def test_store_expires_entries():
+    """Test that entries past their TTL are reported as evicted"""
+    store = ImageStore(max_bytes=100, ttl=0.01)
+    store.put("a", b"x")
+    time.sleep(0.02)
+
+    assert "a" not in store
+    with pytest.raises(ImageEvictedError):
+        store.get("a")
+    assert store.stats()["encoded"]["expirations"] == 1
+
+
+def test_store_unknown_image():
+    """Test that never-uploaded images raise a plain KeyError"""
+    store = ImageStore(max_bytes=100)
+
+    with pytest.raises(KeyError) as excinfo:
+        store.get("missing")
+    assert not isinstance(excinfo.value, ImageEvictedError)
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+import torch
+from segment_anything import SamPredictor
+
+from api.inference_workers import InferenceWorkerPool
+
+
+class _FailingEncoder(torch.nn.Module):
+    """Image encoder that raises inside the worker process"""
+
+    img_size = 1024
+
+    def forward(self, image):
+        raise RuntimeError("encoder exploded")
+
+
+def _image(height=120, width=90):
+    return np.random.default_rng(0).integers(0, 256, size=(height, width, 3), dtype=np.uint8)
+
+
+def test_worker_features_match_in_process_predictor(tiny_sam):
+    """Test that a worker over the shared weights computes SamPredictor.set_image's features"""
+    image = _image()
+    predictor = SamPredictor(tiny_sam)
+    with torch.no_grad():
+        predictor.set_image(image)
+
+    pool = InferenceWorkerPool(tiny_sam, num_workers=1)
+    try:
+        features, input_size = pool.encode(image)
+    finally:
+        pool.shutdown()
+
+    assert tiny_sam.image_encoder.patch_embed.proj.weight.is_shared()
+    assert input_size == tuple(predictor.input_size)
+    assert features.shape == predictor.features.shape
+    assert torch.allclose(features, predictor.features, atol=1e-5)
+    assert pool.stats() == {"size": 1, "submitted": 1, "in_flight": 0}
+
+
+def test_worker_exception_reaches_caller(tiny_sam):
+    """Test that an error raised in the worker process is re-raised by encode"""
+    tiny_sam.image_encoder = _FailingEncoder()
+
+    pool = InferenceWorkerPool(tiny_sam, num_workers=1)
+    try:
+        with pytest.raises(RuntimeError, match="encoder exploded"):
+            pool.encode(_image())
+    finally:
+        pool.shutdown()
+
+    assert pool.stats()["in_flight"] == 0
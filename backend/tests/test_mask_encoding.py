@@ -0,0 +1,48 @@
+import io
+
+import numpy as np
+from PIL import Image
+
+from api.routes import MaskFormat, _create_mask_image, _create_masked_image, _get_mask_bbox
+
+
+def test_mask_bbox_matches_across_dtypes():
+    """Test that float, bool and uint8 masks give the same bbox"""
+    mask = np.zeros((40, 50), dtype=np.float32)
+    mask[10:20, 5:30] = 0.5
+
+    expected = (5, 10, 30, 20)
+    assert _get_mask_bbox(mask) == expected
+    assert _get_mask_bbox(mask > 0) == expected
+    assert _get_mask_bbox((mask * 255).astype(np.uint8)) == expected
+
+
+def test_mask_bbox_empty_mask():
+    """Test that an empty mask returns the full image bounds"""
+    assert _get_mask_bbox(np.zeros((4, 5), dtype=np.float32)) == (0, 0, 5, 4)
+    assert _get_mask_bbox(np.zeros((4, 5), dtype=np.uint8)) == (0, 0, 5, 4)
+
+
+def test_masked_image_is_cropped_cutout():
+    """Test that the cut-out keeps the original pixels inside the bbox"""
+    image = np.random.default_rng(0).integers(0, 255, (40, 50, 3), dtype=np.uint8)
+    mask = np.zeros((40, 50), dtype=np.uint8)
+    mask[10:20, 5:30] = 255
+
+    cutout = np.asarray(Image.open(io.BytesIO(_create_masked_image(image, mask))))
+
+    assert cutout.shape == (10, 25, 4)
+    assert np.array_equal(cutout[..., :3], image[10:20, 5:30])
+    assert (cutout[..., 3] == 255).all()
+
+
+def test_mask_encoding_accepts_uint8_and_float_masks():
+    """Test that uint8 alpha and float masks encode identically"""
+    alpha = np.zeros((40, 50), dtype=np.uint8)
+    alpha[10:20, 5:30] = 255
+    alpha[20:25, 5:30] = 64
+
+    for mask_format in MaskFormat:
+        assert _create_mask_image(alpha, (50, 40), mask_format) == _create_mask_image(
+            alpha / 255.0, (50, 40), mask_format
+        )
@@ -0,0 +1,195 @@
+import numpy as np
+import pytest
+
+from api import mask_refinement_service
+from api.consts import DISTANCE_FIELD_BAND
+from api.mask_refinement_service import (
+    DISTANCE_BACKENDS,
+    FeatheringMethod,
+    _feather,
+    apply_feathering,
+    apply_feathering_u8,
+    distance_field,
+    feather_distance_field,
+    feather_lut,
+    feather_cos,
+    feather_ease_out_exp,
+    feather_ease_out_power,
+    feather_exp,
+    feather_linear,
+    feather_sigmoid,
+    get_distance_backend,
+    set_distance_backend,
+    smooth_open_close,
+)
+
+FEATHER_FUNCTIONS = {
+    FeatheringMethod.NONE: lambda mask, width: mask.astype(np.float32),
+    FeatheringMethod.LINEAR: feather_linear,
+    FeatheringMethod.EXPONENTIAL: feather_exp,
+    FeatheringMethod.COSINE: feather_cos,
+    FeatheringMethod.SIGMOID: feather_sigmoid,
+    FeatheringMethod.EASE_OUT_POWER: feather_ease_out_power,
+    FeatheringMethod.EASE_OUT_EXP: feather_ease_out_exp,
+}
+
+
+@pytest.fixture
+def distance_backend():
+    """Restore the process-wide distance backend after the test"""
+    previous = get_distance_backend()
+    yield lambda name: set_distance_backend(name, DISTANCE_FIELD_BAND)
+    set_distance_backend(previous, DISTANCE_FIELD_BAND)
+
+
+def _blob_mask(shape, center, radius):
+    yy, xx = np.mgrid[: shape[0], : shape[1]]
+    mask = (yy - center[0]) ** 2 + (xx - center[1]) ** 2 < radius**2
+    # Add a thin spike and a notch for the smoothing to act on
+    mask[center[0], center[1] : center[1] + radius + 6] = True
+    mask[center[0] - 2 : center[0] + 2, center[1] - radius : center[1] - radius + 3] = False
+    return mask.astype(np.float32)
+
+
+def _reference(mask, method, width):
+    """Full-image smoothing and feathering, as before ROI restriction"""
+    return FEATHER_FUNCTIONS[method](smooth_open_close(mask, r=4), width)
+
+
+@pytest.mark.parametrize("method", list(FeatheringMethod))
+@pytest.mark.parametrize("center", [(100, 120), (8, 10), (190, 235)])
+def test_roi_feathering_matches_full_image(method, center):
+    """Test that ROI-restricted refinement equals full-image refinement"""
+    mask = _blob_mask((200, 240), center, 20)
+
+    result = apply_feathering(mask, method, 10)
+
+    assert result.dtype == np.float32
+    np.testing.assert_allclose(result, _reference(mask, method, 10), atol=1e-6)
+
+
+def test_feathering_empty_and_full_masks():
+    """Test the trivial edge cases"""
+    empty = np.zeros((30, 40), dtype=np.float32)
+    full = np.ones((30, 40), dtype=np.float32)
+
+    assert not apply_feathering(empty, FeatheringMethod.LINEAR, 10).any()
+    assert (apply_feathering(full, FeatheringMethod.LINEAR, 10) == 1.0).all()
+    assert (_feather(full, lambda t: 1.0 - t, 10) == 1.0).all()
+
+
+@pytest.mark.parametrize("backend", list(DISTANCE_BACKENDS))
+@pytest.mark.parametrize("method", list(FeatheringMethod))
+def test_u8_feathering_matches_float(distance_backend, backend, method):
+    """Test that the fused uint8 kernel matches the float path within rounding"""
+    distance_backend(backend)
+    out = np.full((200, 240), 7, dtype=np.uint8)
+
+    for center in [(100, 120), (8, 10)]:
+        mask = _blob_mask((200, 240), center, 20) > 0
+        expected = apply_feathering(mask, method, 10) * 255
+
+        result = apply_feathering_u8(mask, method, 10, out=out)
+
+        assert result is out
+        assert np.abs(result.astype(np.float32) - expected).max() <= 0.5 + 1e-3
+
+
+@pytest.mark.parametrize("backend", list(DISTANCE_BACKENDS))
+@pytest.mark.parametrize("method", [FeatheringMethod.NONE, FeatheringMethod.EASE_OUT_POWER])
+def test_strips_match_single_pass(monkeypatch, distance_backend, backend, method):
+    """Test that strip-wise smoothing and distances equal processing the ROI at once"""
+    distance_backend(backend)
+    mask = (_blob_mask((200, 240), (100, 120), 40) + _blob_mask((200, 240), (8, 10), 15)) > 0
+    # Sparse holes, so open/close results depend on rows across strip edges
+    mask[60:140, 150:220] = np.random.default_rng(0).random((80, 70)) < 0.97
+
+    monkeypatch.setattr(mask_refinement_service, "STRIP_ROWS", 10_000)
+    expected = apply_feathering_u8(mask, method, 10)
+    expected_field = distance_field(mask, 4, band=16)
+    monkeypatch.setattr(mask_refinement_service, "STRIP_ROWS", 7)
+
+    np.testing.assert_array_equal(apply_feathering_u8(mask, method, 10), expected)
+    field = distance_field(mask, 4, band=16)
+    np.testing.assert_array_equal(field.d2, expected_field.d2)
+    np.testing.assert_array_equal(
+        feather_distance_field(field, method, 10), feather_distance_field(expected_field, method, 10)
+    )
+
+
+def test_scratch_is_released_above_retain_limit(monkeypatch):
+    """Test that a thread does not keep scratch buffers beyond SCRATCH_RETAIN_BYTES"""
+    mask = _blob_mask((300, 300), (150, 150), 100) > 0
+
+    monkeypatch.setattr(mask_refinement_service, "SCRATCH_RETAIN_BYTES", 1024)
+    apply_feathering_u8(mask, FeatheringMethod.LINEAR, 10)
+
+    buffers = getattr(mask_refinement_service._thread_scratch, "buffers", {})
+    assert sum(buffer.nbytes for buffer in buffers.values()) <= 1024
+
+
+def test_u8_feathering_empty_and_full_masks():
+    """Test the trivial edge cases of the uint8 kernel"""
+    assert not apply_feathering_u8(np.zeros((30, 40), dtype=bool), FeatheringMethod.LINEAR).any()
+    full = apply_feathering_u8(np.ones((30, 40), dtype=bool), FeatheringMethod.LINEAR)
+    assert full.dtype == np.uint8
+    assert (full == 255).all()
+
+
+@pytest.mark.parametrize("method", [m for m in FeatheringMethod if m != FeatheringMethod.NONE])
+@pytest.mark.parametrize("width", [1, 3.5, 10, 25])
+def test_lut_feathering_matches_profile_functions(method, width):
+    """Test that the lookup-table path matches the direct profile evaluation"""
+    mask = smooth_open_close(_blob_mask((120, 140), (60, 70), 25), r=4)
+
+    expected = FEATHER_FUNCTIONS[method](mask, width)
+    result = feather_lut(mask, method, width)
+
+    assert result.dtype == np.float32
+    assert np.abs(result - expected).max() <= 1.0 / 255
+
+
+@pytest.mark.parametrize("backend", list(DISTANCE_BACKENDS))
+@pytest.mark.parametrize("width", [1, 3.5, 10])
+def test_distance_backends_agree(distance_backend, backend, width):
+    """Test that every distance backend produces the same feathering"""
+    mask = smooth_open_close(_blob_mask((120, 140), (60, 70), 25), r=4)
+    expected = feather_cos(mask, width)
+
+    distance_backend(backend)
+    result = feather_lut(mask, FeatheringMethod.COSINE, width)
+
+    assert np.abs(result - expected).max() <= 1.0 / 255
+
+
+def test_auto_distance_backend(distance_backend):
+    """Test that auto selection picks one of the registered backends"""
+    assert distance_backend("auto") in DISTANCE_BACKENDS
+    with pytest.raises(ValueError):
+        distance_backend("unknown")
+
+
+@pytest.mark.parametrize("backend", list(DISTANCE_BACKENDS))
+@pytest.mark.parametrize("smooth_radius", [0, 4])
+def test_distance_field_feathering_matches_u8(distance_backend, backend, smooth_radius):
+    """Test that feathering from a cached distance field equals full refinement"""
+    distance_backend(backend)
+    mask = _blob_mask((200, 240), (8, 10), 20) > 0
+    field = distance_field(mask, smooth_radius, band=16)
+
+    for method in FeatheringMethod:
+        for width in [1, 3.5, 10, 16]:
+            expected = apply_feathering_u8(mask, method, width, smooth_radius=smooth_radius)
+            np.testing.assert_array_equal(feather_distance_field(field, method, width), expected)
+
+
+def test_distance_field_limits():
+    """Test empty masks and widths beyond the cached band"""
+    empty = distance_field(np.zeros((30, 40), dtype=bool), band=8)
+    assert not feather_distance_field(empty, FeatheringMethod.LINEAR, 8).any()
+
+    field = distance_field(_blob_mask((60, 60), (30, 30), 10), band=8)
+    with pytest.raises(ValueError):
+        feather_distance_field(field, FeatheringMethod.LINEAR, 9)
+    with pytest.raises(ValueError):
+        distance_field(np.ones((4, 4), dtype=bool), band=256)
@@ -0,0 +1,42 @@
+import cv2
+import numpy as np
+import pytest
+
+from api.mask_upsampling import upsample_mask_roi
+
+
+def _reference(logits, input_size, original_size):
+    """SamPredictor.postprocess_masks: upsample to 1024², crop, resize, threshold"""
+    upsampled = cv2.resize(logits, (1024, 1024), interpolation=cv2.INTER_LINEAR)
+    cropped = upsampled[: input_size[0], : input_size[1]]
+    resized = cv2.resize(cropped, original_size[::-1], interpolation=cv2.INTER_LINEAR)
+    return resized > 0
+
+
+def _input_size(original_size):
+    scale = 1024 / max(original_size)
+    return int(original_size[0] * scale + 0.5), int(original_size[1] * scale + 0.5)
+
+
+@pytest.mark.parametrize("original_size", [(3000, 4000), (800, 600), (480, 640)])
+@pytest.mark.parametrize("center", [(100, 120), (5, 180)])
+def test_upsample_mask_roi_matches_full_upsampling(original_size, center):
+    """Test that ROI upsampling agrees with SAM's full-resolution postprocessing"""
+    yy, xx = np.mgrid[:256, :256]
+    logits = (30 - np.sqrt((yy - center[0]) ** 2 + (xx - center[1]) ** 2)).astype(np.float32)
+    input_size = _input_size(original_size)
+
+    mask = upsample_mask_roi(logits, input_size, original_size)
+    expected = _reference(logits, input_size, original_size)
+
+    assert mask.shape == original_size
+    assert mask.dtype == np.bool_
+    iou = (mask & expected).sum() / (mask | expected).sum()
+    assert iou > 0.99
+
+
+def test_upsample_mask_roi_empty_logits():
+    """Test that all-negative logits give an empty mask"""
+    logits = np.full((256, 256), -5.0, dtype=np.float32)
+
+    assert not upsample_mask_roi(logits, (768, 1024), (3000, 4000)).any()
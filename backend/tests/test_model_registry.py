@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from api import model_registry
+from api.model_registry import ModelSpec, detect_model_type, load_model
+
+
+def _vit_state_dict(width):
+    return {"image_encoder.patch_embed.proj.weight": np.empty((width, 3, 16, 16), dtype=np.float32)}
+
+
+@pytest.mark.parametrize("width,model_type", [(768, "vit_b"), (1024, "vit_l"), (1280, "vit_h")])
+def test_detects_vit_size_from_patch_embedding(width, model_type):
+    """Test that ViT-B/L/H are told apart by the patch embedding width"""
+    assert detect_model_type(_vit_state_dict(width)) == model_type
+
+
+def test_detects_tiny_vit_variant():
+    """Test that a MobileSAM-style TinyViT checkpoint is recognized"""
+    state_dict = {"image_encoder.patch_embed.seq.0.c.weight": np.empty((32, 3, 3, 3))}
+
+    assert detect_model_type(state_dict) == "vit_t"
+
+
+def test_unknown_checkpoint_raises():
+    """Test that checkpoints matching no architecture are rejected"""
+    with pytest.raises(ValueError):
+        detect_model_type(_vit_state_dict(512))
+
+
+class _Model:
+    def __init__(self):
+        self.state_dict = None
+        self.training = True
+
+    def load_state_dict(self, state_dict):
+        self.state_dict = state_dict
+
+    def eval(self):
+        self.training = False
+        return self
+
+
+def test_registered_variant_is_detected_and_loaded(monkeypatch):
+    """Test that a registered architecture is built and receives the checkpoint weights"""
+    state_dict = {"image_encoder.stem.weight": np.empty((16, 3, 3, 3))}
+    monkeypatch.setattr(model_registry, "_models", dict(model_registry._models))
+    monkeypatch.setattr(model_registry, "_load_state_dict", lambda checkpoint: state_dict)
+    model_registry.register_model(
+        ModelSpec("tiny", lambda sd: "image_encoder.stem.weight" in sd, _Model)
+    )
+
+    model = load_model("tiny.pth")
+
+    assert isinstance(model, _Model)
+    assert model.model_type == "tiny"
+    assert model.state_dict is state_dict
+    assert not model.training
+
+
+def test_explicit_unknown_model_type_raises(monkeypatch):
+    """Test that SAM_MODEL_TYPE values outside the registry are rejected"""
+    monkeypatch.setattr(model_registry, "_load_state_dict", lambda checkpoint: _vit_state_dict(768))
+
+    with pytest.raises(ValueError):
+        load_model("sam.pth", "vit_x")
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from api.onnx_backend import (
+    PIXEL_MEAN,
+    PIXEL_STD,
+    OnnxPredictor,
+    OnnxSam,
+    default_threads,
+    export_onnx,
+    normalize_and_pad,
+    pad_points,
+)
+
+
+def test_normalize_and_pad_matches_sam_preprocess():
+    """Test that the image is normalized, moved to CHW and zero-padded bottom-right"""
+    rng = np.random.default_rng(0)
+    image = rng.integers(0, 256, size=(12, 20, 3), dtype=np.uint8)
+
+    batch = normalize_and_pad(image, image_size=32)
+
+    assert batch.shape == (1, 3, 32, 32)
+    assert batch.dtype == np.float32
+    expected = ((image - PIXEL_MEAN) / PIXEL_STD).transpose(2, 0, 1)
+    np.testing.assert_allclose(batch[0, :, :12, :20], expected, rtol=1e-6)
+    assert not batch[0, :, 12:, :].any()
+    assert not batch[0, :, :, 20:].any()
+
+
+def test_pad_points_appends_padding_point():
+    """Test that prompts get PromptEncoder's (0, 0) / -1 padding point and a batch axis"""
+    coords, labels = pad_points(np.array([[10.0, 20.0], [30.0, 40.0]]), np.array([1, 0]))
+
+    assert coords.shape == (1, 3, 2)
+    assert labels.shape == (1, 3)
+    assert coords.dtype == labels.dtype == np.float32
+    np.testing.assert_array_equal(coords[0], [[10, 20], [30, 40], [0, 0]])
+    np.testing.assert_array_equal(labels[0], [1, 0, -1])
+
+
+def test_default_threads_only_split_between_several_encoders(monkeypatch):
+    """Test that a single encoder keeps ONNX Runtime's default and several split the CPUs"""
+    monkeypatch.setattr("os.cpu_count", lambda: 8)
+
+    assert default_threads(1) == 0
+    assert default_threads(2) == 4
+    assert default_threads(16) == 1
+
+
+@pytest.mark.parametrize("multimask", [True, False])
+def test_onnx_predictor_matches_torch(tiny_sam, tmp_path, multimask):
+    """Test that the exported encoder and decoder reproduce the torch predictor's masks and scores"""
+    pytest.importorskip("onnxruntime")
+    from segment_anything import SamPredictor
+
+    image = np.random.default_rng(0).integers(0, 256, size=(120, 90, 3), dtype=np.uint8)
+    points = np.array([[30.0, 40.0], [60.0, 90.0]])
+    labels = np.array([1, 0])
+
+    torch_predictor = SamPredictor(tiny_sam)
+    torch_predictor.set_image(image)
+    masks, scores, low_res = torch_predictor.predict(points, labels, multimask_output=multimask)
+
+    export_onnx(tiny_sam, tmp_path)
+    onnx_sam = OnnxSam(tmp_path, threads=1)
+    onnx_predictor = OnnxPredictor(onnx_sam)
+    onnx_predictor.set_image(image)
+    onnx_low_res, onnx_scores = onnx_predictor.predict_low_res(points, labels, multimask)
+
+    assert onnx_predictor.input_size == torch_predictor.input_size
+    np.testing.assert_allclose(
+        onnx_predictor.features.numpy(), torch_predictor.features.numpy(), atol=1e-4
+    )
+    np.testing.assert_allclose(onnx_scores, scores, atol=1e-4)
+    np.testing.assert_allclose(onnx_low_res.numpy(), low_res, atol=1e-3)
+
+    logits = onnx_sam.postprocess_masks(
+        onnx_low_res[None], onnx_predictor.input_size, onnx_predictor.original_size
+    )[0]
+    onnx_masks = (logits > onnx_sam.mask_threshold).numpy()
+    assert onnx_masks.shape == masks.shape
+    assert (onnx_masks == masks).mean() > 0.999
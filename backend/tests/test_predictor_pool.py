@@ -0,0 +1,73 @@
+import threading
+import time
+
+import pytest
+
+from api.predictor_pool import PredictorPool
+
+
+class _Predictor:
+    def __init__(self, model):
+        self.model = model
+        self.image = None
+
+
+def test_pool_shares_model_between_predictors():
+    """Test that every predictor wraps the same model object"""
+    model = object()
+    pool = PredictorPool(model, 3, _Predictor)
+
+    predictors = [pool.checkout() for _ in range(3)]
+
+    assert len({id(p) for p in predictors}) == 3
+    assert all(p.model is model for p in predictors)
+
+
+def test_pool_limits_concurrency_and_isolates_state():
+    """Test that checkouts never exceed the pool size and never share a predictor"""
+    pool = PredictorPool(object(), 2, _Predictor)
+    active = 0
+    peak = 0
+    errors = []
+    lock = threading.Lock()
+
+    def worker(n):
+        nonlocal active, peak
+        with pool.predictor() as predictor:
+            with lock:
+                active += 1
+                peak = max(peak, active)
+            predictor.image = n
+            time.sleep(0.02)
+            if predictor.image != n:
+                errors.append(n)
+            with lock:
+                active -= 1
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert peak == 2
+    assert not errors
+    stats = pool.stats()
+    assert stats["checkouts"] == 6
+    assert stats["waits"] >= 4
+    assert stats["idle"] == 2
+
+
+def test_pool_checkout_timeout():
+    """Test that checkout gives up when every predictor stays busy"""
+    pool = PredictorPool(object(), 1, _Predictor)
+    pool.checkout()
+
+    with pytest.raises(TimeoutError):
+        pool.checkout(timeout=0.01)
+
+
+def test_pool_rejects_empty_size():
+    """Test that a pool needs at least one predictor"""
+    with pytest.raises(ValueError):
+        PredictorPool(object(), 0, _Predictor)
@@ -0,0 +1,53 @@
+import pytest
+import torch
+
+from api.quantization import quantize_image_encoder
+
+
+class _Sam(torch.nn.Module):
+    """Stand-in with SAM's top-level layout"""
+
+    def __init__(self):
+        super().__init__()
+        self.image_encoder = torch.nn.Sequential(
+            torch.nn.Linear(16, 32), torch.nn.GELU(), torch.nn.Linear(32, 16)
+        )
+        self.mask_decoder = torch.nn.Linear(16, 4)
+
+
+def test_int8_quantizes_only_encoder_linears():
+    """Test that int8 mode swaps the encoder's Linear layers and leaves the decoder fp32"""
+    torch.manual_seed(0)
+    sam = _Sam().eval()
+    x = torch.randn(8, 16)
+    with torch.no_grad():
+        expected = sam.image_encoder(x)
+
+    assert quantize_image_encoder(sam, "int8") is sam
+
+    quantized = [
+        m for m in sam.image_encoder.modules()
+        if isinstance(m, torch.ao.nn.quantized.dynamic.Linear)
+    ]
+    assert len(quantized) == 2
+    assert type(sam.mask_decoder) is torch.nn.Linear
+    with torch.no_grad():
+        actual = sam.image_encoder(x)
+    assert torch.allclose(actual, expected, atol=0.05)
+
+
+def test_empty_mode_keeps_fp32_model():
+    """Test that no quantization mode leaves the encoder untouched"""
+    sam = _Sam()
+    encoder = sam.image_encoder
+
+    quantize_image_encoder(sam, "")
+    quantize_image_encoder(sam, None)
+
+    assert sam.image_encoder is encoder
+
+
+def test_unknown_mode_raises():
+    """Test that unsupported modes are rejected"""
+    with pytest.raises(ValueError):
+        quantize_image_encoder(_Sam(), "int4")
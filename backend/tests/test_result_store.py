@@ -0,0 +1,21 @@
+import time
+
+import pytest
+
+from api.result_store import ResultStore, StoredResult
+
+
+def test_update_does_not_revive_or_extend_results():
+    """Test that re-accounting a result keeps its expiry and never brings an expired one back"""
+    store = ResultStore(max_bytes=1024, ttl=0.2)
+    result = StoredResult(image_id="image", candidates=[], width=4, height=4)
+    result_id = store.put(result)
+
+    time.sleep(0.12)
+    store.update(result_id, result)
+    assert store.get(result_id) is result
+
+    time.sleep(0.12)
+    store.update(result_id, result)
+    with pytest.raises(KeyError):
+        store.get(result_id)
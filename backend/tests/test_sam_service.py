@@ -0,0 +1,47 @@
+import threading
+import time
+
+import numpy as np
+
+from api import sam_service
+
+
+def test_concurrent_first_calls_create_one_service(monkeypatch):
+    """Test that concurrent first requests load the model only once"""
+    created = []
+
+    class _SlowService:
+        def __init__(self):
+            time.sleep(0.05)  # Model loading, long enough for callers to overlap
+            created.append(self)
+
+    monkeypatch.setattr(sam_service, "SAMService", _SlowService)
+    monkeypatch.setattr(sam_service, "_sam_service", None)
+
+    start = threading.Barrier(4)
+    services = []
+
+    def first_request():
+        start.wait()
+        services.append(sam_service.get_sam_service())
+
+    threads = [threading.Thread(target=first_request) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(created) == 1
+    assert all(service is created[0] for service in services)
+
+
+def test_same_bytes_different_shape_are_not_shared():
+    """Test that images with identical bytes but different shapes get their own embeddings"""
+    service = sam_service.get_sam_service()
+    points = [{"x": 10, "y": 10}]
+
+    wide = service.generate_masks(np.full((100, 150, 3), 7, np.uint8), points, [1])
+    tall = service.generate_masks(np.full((150, 100, 3), 7, np.uint8), points, [1])
+
+    assert wide[0]["mask"].shape == (100, 150)
+    assert tall[0]["mask"].shape == (150, 100)